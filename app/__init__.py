@@ -15,6 +15,9 @@ from flask_caching import Cache
 from celery import Celery
 
 from config import Config
+from app.last_seen import LastSeenTracker
+from app.identity import IdentityCache
+from app.connections import ConnectionManager
 
 
 db = SQLAlchemy()
@@ -28,6 +31,9 @@ moment = Moment()
 babel = Babel()
 jsons = UploadSet("jsons", DATA)
 cache = Cache()
+last_seen = LastSeenTracker()
+identity_cache = IdentityCache()
+connections = ConnectionManager()
 celery = Celery(__name__, broker=Config.CELERY_BROKER_URL)
 
 
@@ -43,6 +49,9 @@ def create_app(config_class=Config):
     moment.init_app(app)
     babel.init_app(app)
     cache.init_app(app)
+    last_seen.init_app(app)
+    identity_cache.init_app(app)
+    connections.init_app(app)
     configure_uploads(app, jsons)
     celery.conf.update(app.config)
 
@@ -0,0 +1,51 @@
+import csv
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def get_annotation_files(groups_to_process: list, group_by_series: bool) -> list:
+    """One file per series, the first one listed, or every file if not grouped"""
+    if not group_by_series:
+        return list(groups_to_process)
+    series = {}
+    for file_path, luid in groups_to_process:
+        series.setdefault(luid, file_path)
+    return list(series.values())
+
+
+def _sort_key(row: tuple) -> tuple:
+    # Missing values first, like pandas' na_position="first"
+    plant, date_time = row
+    return (plant is not None, plant, date_time is not None, date_time)
+
+
+def generate_annotation_csv(
+    groups_to_process: list,
+    group_by_series: bool,
+    di_filename: str,
+    metadata: dict,
+):
+    """Writes the plant/date_time rows of the disease index file
+
+    Plants and dates come from metadata, as returned by the metadata index.
+    """
+    files = get_annotation_files(groups_to_process, group_by_series)
+    try:
+        rows = [(metadata[f].plant, metadata[f].date_time) for f in files]
+        rows.sort(key=_sort_key)
+        with open(di_filename, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["plant", "date_time", "disease_index"])
+            writer.writerows(
+                (
+                    "" if plant is None else plant,
+                    "" if date_time is None else date_time,
+                    "",
+                )
+                for plant, date_time in rows
+            )
+    except Exception as e:
+        logger.exception(f"Unable to build disease index file")
+    else:
+        logger.info("Built disease index file")
@@ -2,7 +2,60 @@ from typing import List, Union
 
 from functools import wraps
 from flask_login import current_user
-from flask import render_template, url_for
+from flask import render_template, url_for, session
+
+from app.models import ROLE_SUPER_ADMIN, ROLE_GROUP_ADMIN, ROLE_USER, ROLE_PENDING
+
+# Permissions
+PERM_RUN_PIPELINES = "run_pipelines"
+PERM_MANAGE_USERS = "manage_users"
+PERM_MANAGE_DATABASES = "manage_databases"
+
+ROLE_PERMISSIONS = {
+    ROLE_SUPER_ADMIN: {PERM_RUN_PIPELINES, PERM_MANAGE_USERS, PERM_MANAGE_DATABASES},
+    ROLE_GROUP_ADMIN: {PERM_RUN_PIPELINES, PERM_MANAGE_USERS},
+    ROLE_USER: {PERM_RUN_PIPELINES},
+    ROLE_PENDING: set(),
+}
+
+
+def get_permissions() -> frozenset:
+    """Permissions of the current user, computed once per session
+
+    They are computed again only when the user or its roles change.
+    """
+    if not current_user.is_authenticated:
+        return frozenset()
+    roles = sorted(current_user.role_set)
+    stored = session.get("permissions")
+    if (
+        stored is None
+        or stored.get("user_id") != current_user.id
+        or stored.get("roles") != roles
+    ):
+        permissions = set()
+        for role in roles:
+            permissions.update(ROLE_PERMISSIONS.get(role, ()))
+        stored = {
+            "user_id": current_user.id,
+            "roles": roles,
+            "permissions": sorted(permissions),
+        }
+        session["permissions"] = stored
+    return frozenset(stored["permissions"])
+
+
+def permission_required(permission: str):
+    def decorator(function):
+        @wraps(function)
+        def wrapped_function(*args, **kwargs):
+            if permission in get_permissions():
+                return function(*args, **kwargs)
+            return render_template("errors/403.html"), 403
+
+        return wrapped_function
+
+    return decorator
 
 
 def check_user_roles(
@@ -15,7 +68,7 @@ def check_user_roles(
             if current_user is None:
                 return render_template("errors/403.html"), 403
 
-            user_roles = set(current_user.get_roles_as_list())
+            user_roles = current_user.role_set
             if (
                 not required_roles or user_roles.intersection(required_roles)
             ) and not user_roles.intersection(excluded_roles):
@@ -36,7 +89,7 @@ def group_required(required_group: Union[str, List] = ""):
                 return render_template("errors/403.html"), 403
             if not required_group:
                 return function(*args, **kwargs)
-            user_group = current_user.get_groups_as_list()
+            user_group = current_user.group_set
             if isinstance(required_group, str) and (required_group in user_group):
                 return function(*args, **kwargs)
             elif isinstance(required_group, list):
@@ -0,0 +1,56 @@
+import time
+
+from flask import current_app
+
+from app.stores import get_store
+
+CANCEL_KEY_TIMEOUT = 60 * 60 * 24
+
+
+class CancellationToken:
+    """Per job abort flag kept in the state store
+
+    The flag is checked at most once every check_interval seconds, calls in
+    between are answered from a local copy so the processing loop can use the
+    token as an abort callback without hitting the store for every image.
+    """
+
+    def __init__(self, job_id: str, store, check_interval: float = 2):
+        self.job_id = job_id
+        self._store = store
+        self._check_interval = check_interval
+        self._cancelled = False
+        self._next_check = 0
+
+    @property
+    def key(self) -> str:
+        return f"ipso:cancel:{self.job_id}"
+
+    def cancel(self):
+        self._store.set(self.key, "1", timeout=CANCEL_KEY_TIMEOUT)
+        self._cancelled = True
+
+    def reset(self):
+        self._store.delete(self.key)
+        self._cancelled = False
+        self._next_check = 0
+
+    def is_cancelled(self, use_cache: bool = True) -> bool:
+        if self._cancelled:
+            return True
+        now = time.monotonic()
+        if not use_cache or now >= self._next_check:
+            self._cancelled = self._store.get(self.key) is not None
+            self._next_check = now + self._check_interval
+        return self._cancelled
+
+    def __call__(self) -> bool:
+        return self.is_cancelled()
+
+
+def get_cancellation_token(job_id: str) -> CancellationToken:
+    return CancellationToken(
+        job_id=job_id,
+        store=get_store(),
+        check_interval=current_app.config["CANCELLATION_CHECK_INTERVAL"],
+    )
@@ -0,0 +1,254 @@
+import os
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+def get_connection_key(dbi) -> str:
+    return json.dumps(dbi.to_json(), sort_keys=True)
+
+
+def _file_signature(path: str) -> str:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return ""
+    return f"{stat.st_size}|{stat.st_mtime_ns}"
+
+
+def _is_pandas(wrapper) -> bool:
+    """Phenoserre and phenopsis wrappers hold their whole catalog in a dataframe"""
+    return hasattr(wrapper, "connect_from_cache")
+
+
+def _is_engine_healthy(wrapper) -> bool:
+    engine = wrapper.engine
+    if engine is None:
+        return False
+    try:
+        if isinstance(engine, sqlite3.Connection):
+            engine.execute("SELECT 1").fetchall()
+        else:
+            from sqlalchemy import text
+
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+    except Exception as e:
+        logger.info(
+            f"Dropping broken connection to {wrapper.db_info.display_name}: {repr(e)}"
+        )
+        return False
+    return True
+
+
+def _close(wrapper):
+    """Releases the pooled side of a connection, leases still in use keep working
+
+    SQLite connections are closed by the garbage collector once no lease holds
+    them, SQLAlchemy engines reconnect if a lease uses them after dispose.
+    """
+    engine = getattr(wrapper, "engine", None)
+    if engine is None:
+        return
+    if not isinstance(engine, sqlite3.Connection):
+        try:
+            engine.dispose()
+        except Exception as e:
+            logger.warning(f"Unable to close connection: {repr(e)}")
+    wrapper.engine = None
+
+
+def _lease(wrapper):
+    """Copy of a connected wrapper sharing its catalog or engine
+
+    Pandas catalogs are only read by the callers, SQLAlchemy engines pool their
+    own connections and SQLite connections are pooled per thread.
+    """
+    lease = wrapper.copy()
+    if _is_pandas(wrapper):
+        lease.dataframe = wrapper.dataframe
+    else:
+        lease.engine = wrapper.engine
+    lease.main_selector = dict(wrapper.main_selector)
+    return lease
+
+
+class ConnectionManager:
+    """Per process pool of connected experiment databases
+
+    Requests and tasks running in the same process share one connection per
+    experiment, loaded catalog for phenoserre and phenopsis, engine for SQL
+    targets. Connections unused for idle_timeout seconds are closed, the least
+    recently used ones are closed beyond max_size, and a connection is checked
+    every health_check_interval seconds before being handed out again. Pandas
+    catalogs are loaded from their local snapshot when snapshots are enabled,
+    and reloaded when the file they came from changed or went stale.
+    """
+
+    def __init__(
+        self,
+        idle_timeout: float = 600,
+        max_size: int = 16,
+        health_check_interval: float = 60,
+    ):
+        self.idle_timeout = idle_timeout
+        self.max_size = max_size
+        self.health_check_interval = health_check_interval
+        # key -> [wrapper, last_used, last_checked, signature]
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # key -> [lock, threads holding or waiting for it], dropped when unused
+        self._key_locks = {}
+        self.snapshots = None
+        self._snapshot_settings = None
+
+    def init_app(self, app):
+        self.idle_timeout = app.config["DB_POOL_IDLE_TIMEOUT"]
+        self.max_size = app.config["DB_POOL_MAX_SIZE"]
+        self.health_check_interval = app.config["DB_POOL_HEALTH_CHECK_INTERVAL"]
+        if app.config["CATALOG_SNAPSHOTS"]:
+            self._snapshot_settings = (
+                app.config["CATALOG_SNAPSHOT_PATH"],
+                app.config["CATALOG_SNAPSHOT_REFRESH_INTERVAL"],
+            )
+
+    def _get_snapshots(self):
+        # Imported on first use, it needs pandas and pyarrow
+        if self.snapshots is None and self._snapshot_settings is not None:
+            from app.snapshots import CatalogSnapshots
+
+            folder, refresh_interval = self._snapshot_settings
+            self.snapshots = CatalogSnapshots(folder, refresh_interval)
+        return self.snapshots
+
+    def _catalog_path(self, wrapper) -> str:
+        snapshots = self._get_snapshots()
+        if snapshots is not None:
+            return snapshots.get_path(wrapper.db_info)
+        return wrapper.cache_file_path
+
+    def _signature(self, wrapper) -> str:
+        """Changes when the file a pandas catalog was loaded from is rewritten"""
+        if not _is_pandas(wrapper) or wrapper.dataframe is None:
+            return ""
+        return _file_signature(self._catalog_path(wrapper))
+
+    def _is_healthy(self, wrapper, signature: str) -> bool:
+        if not _is_pandas(wrapper):
+            return _is_engine_healthy(wrapper)
+        snapshots = self._get_snapshots()
+        return (
+            wrapper.dataframe is not None
+            and self._signature(wrapper) == signature
+            and (snapshots is None or not snapshots.is_stale(wrapper.db_info))
+        )
+
+    @staticmethod
+    def _make_key(dbi) -> str:
+        key = get_connection_key(dbi)
+        if dbi.target == "sqlite":
+            # SQLite connections can only be used by the thread that opened them
+            key += f"/{threading.get_ident()}"
+        return key
+
+    @contextmanager
+    def _key_lock(self, key: str):
+        with self._lock:
+            entry = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._key_locks[key]
+
+    def evict_idle(self) -> int:
+        """Closes connections unused for idle_timeout seconds, returns their count"""
+        limit = time.monotonic() - self.idle_timeout
+        with self._lock:
+            expired = [k for k, e in self._entries.items() if e[1] < limit]
+            entries = [self._entries.pop(k) for k in expired]
+        for entry in entries:
+            _close(entry[0])
+        return len(entries)
+
+    def _trim(self):
+        with self._lock:
+            entries = []
+            while len(self._entries) > self.max_size:
+                entries.append(self._entries.popitem(last=False)[1])
+        for entry in entries:
+            _close(entry[0])
+
+    def _connect(self, dbi):
+        from ipso_phen.ipapi.database.db_factory import db_info_to_database
+
+        wrapper = db_info_to_database(dbi)
+        if isinstance(wrapper, str):
+            raise ValueError(wrapper)
+        start = time.monotonic()
+        snapshots = self._get_snapshots()
+        if snapshots is not None and _is_pandas(wrapper):
+            snapshots.connect(wrapper)
+        else:
+            wrapper.connect()
+        logger.info(
+            f"Connected to {dbi.display_name} in {time.monotonic() - start:.2f}s"
+        )
+        return wrapper
+
+    def get(self, dbi):
+        """Returns a connected database wrapper for dbi, reusing pooled connections"""
+        self.evict_idle()
+        key = self._make_key(dbi)
+        with self._key_lock(key):
+            now = time.monotonic()
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+            if entry is not None and now - entry[2] >= self.health_check_interval:
+                if self._is_healthy(entry[0], entry[3]):
+                    entry[2] = now
+                else:
+                    with self._lock:
+                        self._entries.pop(key, None)
+                    _close(entry[0])
+                    entry = None
+            if entry is None:
+                wrapper = self._connect(dbi)
+                entry = [wrapper, now, now, self._signature(wrapper)]
+                with self._lock:
+                    self._entries[key] = entry
+            entry[1] = now
+            lease = _lease(entry[0])
+        self._trim()
+        return lease
+
+    def invalidate(self, dbi):
+        """Closes the pooled connections of dbi, next get connects again"""
+        prefix = get_connection_key(dbi)
+        with self._lock:
+            keys = [k for k in self._entries if k.startswith(prefix)]
+            entries = [self._entries.pop(k) for k in keys]
+        for entry in entries:
+            _close(entry[0])
+
+    def clear(self):
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+        for entry in entries:
+            _close(entry[0])
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,28 @@
+from flask_wtf import FlaskForm
+from wtforms import StringField, SelectField, SubmitField
+from wtforms.validators import ValidationError, DataRequired
+from flask_babel import _, lazy_gettext as _l
+from app.models import Database, AVAILABLE_DB_TARGETS
+
+
+class AddDatabaseForm(FlaskForm):
+    name = StringField(_l("Name"), validators=[DataRequired()])
+    target = SelectField(
+        _l("Type"),
+        choices=[(t, t) for t in AVAILABLE_DB_TARGETS],
+    )
+    submit = SubmitField(_l("Add"))
+
+    def validate_name(self, name):
+        if Database.query.filter_by(name=name.data).first() is not None:
+            raise ValidationError(_("Please use a different name."))
+
+
+class SelectDatabaseForm(FlaskForm):
+    database = SelectField(_l("Database"))
+    submit = SubmitField(_l("Select"))
+
+
+class RemoveDatabaseForm(FlaskForm):
+    database = SelectField(_l("Database"))
+    submit = SubmitField(_l("Remove"))
@@ -0,0 +1,39 @@
+from functools import lru_cache
+
+from app.models import (
+    Database,
+    DB_TARGET_PHENOSERRE,
+    DB_TARGET_PHENOPSIS,
+    DB_TARGET_PSQL_LOCAL,
+    DB_TARGET_SQLITE,
+)
+
+# ipso_phen experiment lists holding the experiments of each target
+TARGET_DB_TYPES = {
+    DB_TARGET_PHENOSERRE: ["PHENOSERRE"],
+    DB_TARGET_PHENOPSIS: ["PHENOPSIS"],
+    DB_TARGET_PSQL_LOCAL: ["LOCAL_DB", "MASS_DB"],
+    DB_TARGET_SQLITE: ["CUSTOM_DB"],
+}
+
+
+def get_database_choices() -> list:
+    return [(d.name, d.name) for d in Database.query.order_by(Database.name)]
+
+
+def get_database_target(name: str) -> str:
+    """Target of a registered database, older sessions stored the target itself"""
+    database = Database.query.filter_by(name=name).first()
+    return database.target if database is not None else name
+
+
+@lru_cache(maxsize=None)
+def get_experiment_choices(target: str) -> tuple:
+    """(DbInfo json, display name) of the experiments of target, built once per process"""
+    from ipso_phen.ipapi.database.db_initializer import available_db_dicts, DbType
+
+    return tuple(
+        (dbi.to_json(), dbi.display_name)
+        for db_type in TARGET_DB_TYPES.get(target, ["CUSTOM_DB"])
+        for dbi in available_db_dicts[DbType[db_type]]
+    )
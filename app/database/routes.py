@@ -1,25 +1,76 @@
 from flask_login import current_user, login_required
-from flask import render_template, url_for
+from flask import render_template, redirect, url_for, flash, session
+from flask_babel import _
 
+from app import db
+from app.models import Database
 from app.database import bp
-from app.auth.funs import check_user_roles
+from app.database.forms import (
+    AddDatabaseForm,
+    SelectDatabaseForm,
+    RemoveDatabaseForm,
+)
+from app.database.funs import get_database_choices
+from app.auth.funs import (
+    check_user_roles,
+    permission_required,
+    PERM_MANAGE_DATABASES,
+)
 
 
 @bp.route("/select_database", methods=["GET", "POST"])
 @login_required
+@check_user_roles(excluded_roles=["pending"])
 def select_database():
-    return render_template("database/select_database.html")
+    form = SelectDatabaseForm(database=session.get("database"))
+    form.database.choices = get_database_choices()
+    if form.validate_on_submit():
+        session["database"] = form.database.data
+        return redirect(url_for("main.select_pipeline_and_database"))
+    return render_template(
+        "database/select_database.html",
+        title=_("Select database"),
+        form=form,
+    )
 
 
 @bp.route("/remove_database", methods=["GET", "POST"])
 @login_required
-@check_user_roles(required_roles=["admin"])
+@permission_required(PERM_MANAGE_DATABASES)
 def remove_database():
-    return render_template(template_name_or_list="database/remove_database.html")
+    form = RemoveDatabaseForm()
+    form.database.choices = get_database_choices()
+    if form.validate_on_submit():
+        Database.query.filter_by(name=form.database.data).delete()
+        db.session.commit()
+        if session.get("database") == form.database.data:
+            session.pop("database", None)
+        flash(_("Database %(name)s removed", name=form.database.data))
+        return redirect(url_for("database.remove_database"))
+    return render_template(
+        template_name_or_list="database/remove_database.html",
+        title=_("Remove database"),
+        form=form,
+    )
 
 
 @bp.route("/add_database", methods=["GET", "POST"])
 @login_required
-@check_user_roles(required_roles=["admin"])
+@permission_required(PERM_MANAGE_DATABASES)
 def add_database():
-    return render_template(template_name_or_list="database/add_database.html")
+    form = AddDatabaseForm()
+    if form.validate_on_submit():
+        db.session.add(
+            Database(
+                name=form.name.data,
+                target=form.target.data,
+            )
+        )
+        db.session.commit()
+        flash(_("Database %(name)s added", name=form.name.data))
+        return redirect(url_for("database.select_database"))
+    return render_template(
+        template_name_or_list="database/add_database.html",
+        title=_("Add database"),
+        form=form,
+    )
@@ -0,0 +1,170 @@
+import logging
+import sqlite3
+
+import pandas as pd
+
+import plotly.express as px
+
+logger = logging.getLogger(__name__)
+
+DIGEST_COLUMNS = ["Plant", "date", "Camera", "view_option"]
+
+# Day and hour of date_time in each SQL dialect able to aggregate the catalog
+SQL_DATE_PARTS = {
+    "sqlite": ("date(date_time)", "CAST(strftime('%H', date_time) AS INTEGER)"),
+    "postgresql": (
+        "CAST(date_time AS DATE)",
+        "CAST(EXTRACT(HOUR FROM date_time) AS INTEGER)",
+    ),
+}
+
+
+def bin_experiment(experiment: pd.DataFrame) -> dict:
+    """Reduces an experiment to its observation count, distinct counts and date x hour bins"""
+    if experiment.shape[0] == 0:
+        return {
+            "count": 0,
+            "distinct": {},
+            "bins": pd.DataFrame(columns=["date", "hour", "count"]),
+        }
+
+    date_time = pd.to_datetime(experiment["date_time"])
+    day = date_time.dt.normalize()
+    bins = (
+        pd.DataFrame({"date": day, "hour": date_time.dt.hour})
+        .groupby(["date", "hour"], sort=True)
+        .size()
+        .rename("count")
+        .reset_index()
+    )
+    distinct = {
+        col: int(
+            day.nunique(dropna=False)
+            if col == "date"
+            else experiment[col].nunique(dropna=False)
+        )
+        for col in DIGEST_COLUMNS
+    }
+
+    return {"count": int(experiment.shape[0]), "distinct": distinct, "bins": bins}
+
+
+def get_sql_dialect(database):
+    """SQL dialect of a connected database wrapper, None if it can not aggregate"""
+    engine = getattr(database, "engine", None)
+    if engine is None:
+        return None
+    if isinstance(engine, sqlite3.Connection):
+        return "sqlite"
+    dialect = getattr(getattr(engine, "dialect", None), "name", None)
+    return dialect if dialect in SQL_DATE_PARTS else None
+
+
+def _count_distinct(expression: str, dialect: str) -> str:
+    if dialect == "sqlite":
+        # Catalog text columns are NOCASE, pandas tells the case apart
+        expression = f"{expression} COLLATE BINARY"
+    # NULL is a value of its own, as with nunique(dropna=False)
+    return (
+        f"COUNT(DISTINCT {expression})"
+        f" + MAX(CASE WHEN {expression} IS NULL THEN 1 ELSE 0 END)"
+    )
+
+
+def _execute(database, dialect: str, query: str) -> list:
+    if dialect == "sqlite":
+        return database.engine.execute(query).fetchall()
+    from sqlalchemy import text
+
+    with database.engine.connect() as conn:
+        return conn.execute(text(query)).fetchall()
+
+
+def aggregate_experiment_sql(database, dialect: str) -> dict:
+    """bin_experiment computed by the database, only the bins are transferred"""
+    table = database.main_table
+    day, hour = SQL_DATE_PARTS[dialect]
+    columns = {
+        "Plant": "Plant",
+        "date": day,
+        "Camera": "Camera",
+        "view_option": "view_option",
+    }
+    count, *distinct = _execute(
+        database,
+        dialect,
+        "SELECT COUNT(*), "
+        + ", ".join(_count_distinct(columns[col], dialect) for col in DIGEST_COLUMNS)
+        + f" FROM {table}",
+    )[0]
+    if not count:
+        return bin_experiment(pd.DataFrame())
+    rows = _execute(
+        database,
+        dialect,
+        f"SELECT {day} AS day, {hour} AS hour, COUNT(*) FROM {table}"
+        f" WHERE date_time IS NOT NULL GROUP BY 1, 2 ORDER BY 1, 2",
+    )
+    bins = pd.DataFrame(rows, columns=["date", "hour", "count"])
+    bins["date"] = pd.to_datetime(bins["date"])
+    bins["hour"] = bins["hour"].astype("int64")
+    bins["count"] = bins["count"].astype("int64")
+    return {
+        "count": int(count),
+        "distinct": {col: int(c) for col, c in zip(DIGEST_COLUMNS, distinct)},
+        "bins": bins,
+    }
+
+
+def aggregate_experiment(database) -> dict:
+    """Summary of a connected experiment database, same as bin_experiment
+
+    SQL backends run GROUP BY and COUNT DISTINCT queries, catalogs held in a
+    dataframe (phenoserre, phenopsis) and failed queries use bin_experiment.
+    """
+    dialect = get_sql_dialect(database)
+    if dialect is not None:
+        try:
+            return aggregate_experiment_sql(database, dialect)
+        except Exception as e:
+            logger.warning(
+                f"Aggregation query failed, binning the catalog instead: {repr(e)}"
+            )
+    experiment = getattr(database, "dataframe", None)
+    if experiment is None:
+        experiment = database.query_to_pandas(
+            command="SELECT",
+            columns="Plant, date_time, Camera, view_option",
+        )
+    return bin_experiment(experiment)
+
+
+def build_experiment_digest(summary: dict):
+    if summary["count"] > 0:
+        desc_lines = {
+            f"{col.replace('_', ' ').capitalize()}s": f"{count} unique"
+            for col, count in summary["distinct"].items()
+        }
+        fig = px.density_heatmap(
+            title="Observations per day and hour",
+            data_frame=summary["bins"],
+            x="date",
+            y="hour",
+            z="count",
+            histfunc="sum",
+            height=400,
+        )
+        fig.update_yaxes(tick0=-0.5)
+    else:
+        desc_lines = {col: "None" for col in ["plant", "date", "camera", "view_option"]}
+        fig = None
+
+    return summary["count"], desc_lines, fig
+
+
+def get_experiment_digest(experiment: pd.DataFrame):
+    return build_experiment_digest(bin_experiment(experiment))
+
+
+def get_database_digest(database):
+    return build_experiment_digest(aggregate_experiment(database))
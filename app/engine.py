@@ -0,0 +1,343 @@
+import os
+import atexit
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from billiard import Pool
+
+from app.result_index import get_pipeline_hash
+from app.previews import PreviewCache, store_preview
+from app.pipelines import get_compiled_pipeline
+
+logger = logging.getLogger(__name__)
+
+EXECUTION_MODES = [
+    ("threads", "Pipeline processor"),
+    ("processes", "Process pool"),
+]
+
+# Per worker process state, filled once by the pool initializer
+_worker_state = {}
+
+# Pool key -> [(pool, time it is terminated at)] of the pools no job uses
+_idle_pools = {}
+_busy_pools = set()
+_pools_lock = threading.Lock()
+
+# Results handled between two trims of the preview cache
+PREVIEW_TRIM_INTERVAL = 50
+
+
+def _init_worker(script: dict, options, database, previews=None):
+    # Workers only ever run the pipeline of their pool
+    _worker_state["script"] = get_compiled_pipeline(script, cache_size=1)
+    _worker_state["options"] = options
+    _worker_state["database"] = database
+    _worker_state["previews"] = previews
+
+
+def _get_pipeline_worker():
+    # _pipeline_worker is private to ipso_phen, checked against 0.7.112: it takes
+    # (group, options, script, database), as PipelineProcessor.process_groups
+    # passes them, and returns a dict holding the boolean result.
+    try:
+        from ipso_phen.ipapi.base.pipeline_processor import _pipeline_worker
+    except ImportError as e:
+        raise ImportError(
+            "This ipso_phen version has no pipeline_processor._pipeline_worker,"
+            " app/engine.py must be updated to its processing entry point"
+        ) from e
+    return _pipeline_worker
+
+
+def _run_group(arg):
+    """Runs _pipeline_worker, the result also holds the group it belongs to"""
+    res = _get_pipeline_worker()(arg) or {"result": False}
+    res["group"] = arg[0]
+    return res
+
+
+def _process_group(group):
+    database = _worker_state["database"]
+    res = _run_group(
+        (
+            group,
+            _worker_state["options"],
+            _worker_state["script"],
+            None if database is None else database.copy(),
+        )
+    )
+    previews = _worker_state.get("previews")
+    if previews and res.get("result") is True:
+        res["preview_id"] = store_preview(
+            _worker_state["script"],
+            folder=previews["folder"],
+            max_size=previews["max_size"],
+        )
+    return res
+
+
+def _terminate(pool):
+    # Workers stopped in the middle of a group take billiard up to 30s to join
+    threading.Thread(target=pool.terminate, daemon=True).start()
+
+
+def acquire_pool(processes: int, script: dict, options, database, previews=None):
+    """Returns the key and a pool whose workers hold the pipeline, for one job
+
+    A pool runs the groups of a single job at a time, so stopping a job never
+    touches the work of another. Pools left idle by earlier runs of the same
+    pipeline are reused, idle pools of other pipelines are terminated. Each
+    call must be paired with release_pool.
+    """
+    key = (
+        processes,
+        get_pipeline_hash(script),
+        options.dst_path,
+        options.overwrite,
+        None if database is None else repr(database.db_info.to_json()),
+        None if not previews else tuple(sorted(previews.items())),
+    )
+    with _pools_lock:
+        stale = [
+            pool
+            for idle_key in [k for k in _idle_pools if k != key]
+            for pool, _ in _idle_pools.pop(idle_key)
+        ]
+        idle = _idle_pools.get(key)
+        pool = idle.pop()[0] if idle else None
+        if idle == []:
+            del _idle_pools[key]
+    for stale_pool in stale:
+        _terminate(stale_pool)
+    if pool is None:
+        logger.info(f"Starting process pool with {processes} workers")
+        pool = Pool(
+            processes=processes,
+            initializer=_init_worker,
+            initargs=(script, options, database, previews),
+        )
+    with _pools_lock:
+        _busy_pools.add(pool)
+    return key, pool
+
+
+def release_pool(key, pool, idle_timeout: float, done: bool = True):
+    """Gives back the pool of a job, kept idle for idle_timeout seconds
+
+    Pools of aborted or interrupted jobs are terminated, their queued groups
+    would otherwise keep the workers busy.
+    """
+    with _pools_lock:
+        _busy_pools.discard(pool)
+        if done and idle_timeout > 0:
+            _idle_pools.setdefault(key, []).append(
+                (pool, time.monotonic() + idle_timeout)
+            )
+            pool = None
+    if pool is not None:
+        _terminate(pool)
+        return
+    reaper = threading.Timer(idle_timeout + 1, close_idle_pools)
+    reaper.daemon = True
+    reaper.start()
+
+
+def close_idle_pools():
+    """Terminates the pools idle for longer than their timeout"""
+    now = time.monotonic()
+    expired = []
+    with _pools_lock:
+        for key in list(_idle_pools):
+            kept = [e for e in _idle_pools[key] if e[1] > now]
+            expired.extend(e[0] for e in _idle_pools[key] if e[1] <= now)
+            if kept:
+                _idle_pools[key] = kept
+            else:
+                del _idle_pools[key]
+    for pool in expired:
+        pool.terminate()
+
+
+def close_pools():
+    with _pools_lock:
+        pools = list(_busy_pools) + [
+            pool for idle in _idle_pools.values() for pool, _ in idle
+        ]
+        _busy_pools.clear()
+        _idle_pools.clear()
+    for pool in pools:
+        pool.terminate()
+
+
+atexit.register(close_pools)
+
+
+def _imap_groups(
+    pipeline_processor,
+    groups_list,
+    script,
+    database,
+    processes,
+    previews=None,
+    pool_idle_timeout=0,
+):
+    os.makedirs(pipeline_processor.options.partials_path, exist_ok=True)
+    key, pool = acquire_pool(
+        processes=max(1, int(processes)),
+        script=script,
+        options=pipeline_processor.options,
+        database=database,
+        previews=previews,
+    )
+    preview_cache = (
+        PreviewCache(folder=previews["folder"], max_items=previews["max_items"])
+        if previews
+        else None
+    )
+    done = False
+    try:
+        for i, res in enumerate(pool.imap_unordered(_process_group, groups_list)):
+            if pipeline_processor.check_abort():
+                logger.info("User stopped process")
+                break
+            if preview_cache is not None and i % PREVIEW_TRIM_INTERVAL == 0:
+                preview_cache.trim()
+            yield i, res
+        else:
+            done = True
+    finally:
+        release_pool(key, pool, idle_timeout=pool_idle_timeout, done=done)
+
+
+@contextmanager
+def _collect_succeeded(pipeline_processor, groups_list, succeeded):
+    """Appends to succeeded the groups pipeline_processor ran successfully
+
+    Its results are seen through handle_result and yield_handle_result. On
+    success they name the image wrapper, not the group, while failures raised
+    by the pipeline name their group: when every failure is matched to a
+    group, the others succeeded. Otherwise, or on abort, nothing is recorded
+    and the groups are run again next time.
+    """
+    if succeeded is None:
+        yield
+        return
+    results = []
+    handle_result = pipeline_processor.handle_result
+    yield_handle_result = pipeline_processor.yield_handle_result
+
+    def collect_handle_result(res, *args):
+        results.append(res)
+        return handle_result(res, *args)
+
+    def collect_yield_handle_result(res, *args):
+        results.append(res)
+        return yield_handle_result(res, *args)
+
+    pipeline_processor.handle_result = collect_handle_result
+    pipeline_processor.yield_handle_result = collect_yield_handle_result
+    try:
+        yield
+    finally:
+        del pipeline_processor.handle_result
+        del pipeline_processor.yield_handle_result
+    if len(results) != len(groups_list):
+        return
+    failed = {res.get("image_name") for res in results if res.get("result") is not True}
+    if not failed.issubset(groups_list):
+        logger.info(
+            f"{len(failed)} images failed, some can not be told apart:"
+            " the result index is not updated"
+        )
+        return
+    succeeded.extend(group for group in groups_list if group not in failed)
+
+
+def _record_success(res, succeeded):
+    if succeeded is not None and res.get("result") is True:
+        succeeded.append(res["group"])
+
+
+def process_groups(
+    pipeline_processor,
+    groups_list,
+    script,
+    database,
+    processes,
+    mode="processes",
+    succeeded=None,
+    pool_idle_timeout=0,
+):
+    """Processes the groups, those whose pipeline succeeded are appended to succeeded
+
+    The process pool is kept pool_idle_timeout seconds for the next run.
+    """
+    if not groups_list:
+        return
+    if mode != "processes":
+        with _collect_succeeded(pipeline_processor, groups_list, succeeded):
+            pipeline_processor.process_groups(groups_list=groups_list)
+        return
+    logger.info(f"   --- Processing {len(groups_list)} files ({mode}) ---")
+    pipeline_processor.init_progress(total=len(groups_list), desc="Processing images")
+    for i, res in _imap_groups(
+        pipeline_processor,
+        groups_list,
+        script,
+        database,
+        processes,
+        pool_idle_timeout=pool_idle_timeout,
+    ):
+        _record_success(res, succeeded)
+        pipeline_processor.handle_result(res, i, len(groups_list))
+    pipeline_processor.close_progress()
+    logger.info("   --- Files processed ---")
+
+
+def yield_process_groups(
+    pipeline_processor,
+    groups_list,
+    script,
+    database,
+    processes,
+    previews=None,
+    mode="processes",
+    succeeded=None,
+    pool_idle_timeout=0,
+):
+    """Yields progress steps, with the id of the result thumbnail when previews are on
+
+    previews holds the folder, max_size and max_items of the preview cache, only
+    the process pool builds thumbnails.
+    """
+    if not groups_list:
+        return
+    if mode != "processes":
+        with _collect_succeeded(pipeline_processor, groups_list, succeeded):
+            yield from pipeline_processor.yield_process_groups(groups_list=groups_list)
+        return
+    logger.info(f"   --- Processing {len(groups_list)} files ({mode}) ---")
+    pipeline_processor.init_progress(
+        total=len(groups_list),
+        desc="Processing images",
+        yield_mode=True,
+    )
+    for i, res in _imap_groups(
+        pipeline_processor,
+        groups_list,
+        script,
+        database,
+        processes,
+        previews,
+        pool_idle_timeout,
+    ):
+        _record_success(res, succeeded)
+        for step in pipeline_processor.yield_handle_result(res, i, len(groups_list)):
+            if res.get("preview_id"):
+                step["preview"] = res["preview_id"]
+            yield step
+    pipeline_processor.close_progress()
+    logger.info("   --- Files processed ---")
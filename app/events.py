@@ -0,0 +1,64 @@
+import json
+import time
+
+try:
+    import orjson
+
+    def dumps(data) -> str:
+        return orjson.dumps(data, option=orjson.OPT_SORT_KEYS).decode("utf-8")
+
+
+except ImportError:
+
+    def dumps(data) -> str:
+        return json.dumps(data, separators=(",", ":"), sort_keys=True)
+
+
+def format_event(data: dict) -> str:
+    return f"data: {dumps(data)}\n\n"
+
+
+class ProgressEmitter:
+    """Coalesces progress updates into at most max_rate server sent events per second
+
+    update() merges its values into the pending event and only returns a frame
+    when the rate allows it. phase() and final() always return a frame that
+    includes whatever was pending, so no phase change or end state is lost.
+    Callers building their own messages use ready() and mark_emitted() instead.
+    """
+
+    def __init__(self, max_rate: float = 4, clock=time.monotonic):
+        self._min_interval = 1 / max_rate if max_rate > 0 else 0
+        self._clock = clock
+        self._last_emit = None
+        self._pending = {}
+
+    def ready(self) -> bool:
+        """Whether the rate allows an event now"""
+        return (
+            self._last_emit is None
+            or self._clock() - self._last_emit >= self._min_interval
+        )
+
+    def mark_emitted(self):
+        """Records an event sent by the caller, pending values included"""
+        self._pending = {}
+        self._last_emit = self._clock()
+
+    def _emit(self, data: dict) -> str:
+        self._pending.update(data)
+        frame = format_event(self._pending)
+        self.mark_emitted()
+        return frame
+
+    def update(self, **data):
+        self._pending.update(data)
+        if self.ready():
+            return self._emit({})
+        return None
+
+    def phase(self, header: str, **data) -> str:
+        return self._emit(dict(header=header, **data))
+
+    def final(self, header: str, **data) -> str:
+        return self._emit(dict(header=header, close=True, **data))
@@ -1,24 +1,40 @@
 import os
 import json
+import hashlib
 import logging
-
-import pandas as pd
-
-import plotly.express as px
+import time
+import uuid
+from datetime import datetime
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
 
 logger = logging.getLogger(__name__)
 
-from flask import flash
-
-from app import cache, celery
-
-import pandas as pd
-
-from ipso_phen.ipapi.base.pipeline_processor import PipelineProcessor
-from ipso_phen.ipapi.base.ipt_loose_pipeline import LoosePipeline
-from ipso_phen.ipapi.file_handlers.fh_base import file_handler_factory
-from ipso_phen.ipapi.database.base import DbInfo
-from ipso_phen.ipapi.database.db_factory import db_info_to_database
+from flask import flash, current_app
+
+from celery import chord
+
+from app import cache, celery, db, connections
+from app.models import (
+    Job,
+    JOB_PROGRESS,
+    JOB_SUCCESS,
+    JOB_FAILURE,
+    JOB_REVOKED,
+    JOB_STREAM,
+)
+from app.cancellation import get_cancellation_token
+from app.progress import get_progress_channel
+from app.result_index import ResultIndex, get_pipeline_hash
+from app import engine
+from app.annotations import generate_annotation_csv
+from app.metadata_index import MetadataIndex, group_by_series
+from app.prefetch import Prefetcher, read_source
+from app.pipelines import get_compiled_pipeline
+from app.shared_cache import cached_call
+
+# pandas, plotly, pyarrow and ipso_phen are imported by the functions that use
+# them so the web app and CLI start without paying for them
 
 
 def get_user_path(user_name: str, key: str, extra: str = ""):
@@ -28,11 +44,6 @@ def get_user_path(user_name: str, key: str, extra: str = ""):
             "generated_files",
             f"{user_name}_launch_conf.json",
         ),
-        "abort_touch": os.path.join(
-            ".",
-            "generated_files",
-            f".{user_name}_abort",
-        ),
         "analysis_folder": os.path.join(
             ".",
             "generated_files",
@@ -66,6 +77,10 @@ def get_source_configuration(url: str):
             series_id_time_delta=0,
             thread_count=1,
             build_annotation_csv=False,
+            distributed=False,
+            execution_mode="threads",
+            prefetch_depth=0,
+            emit_previews=False,
         )
     else:
         return None
@@ -75,10 +90,6 @@ def get_launch_config_path(user_name: str) -> str:
     return get_user_path(user_name=user_name, key="launch_conf")
 
 
-def get_abort_file_path(user_name: str) -> str:
-    return get_user_path(user_name=user_name, key="abort_touch")
-
-
 def get_launch_configuration(user_name: str):
     launch_conf_path = get_launch_config_path(user_name=user_name)
     if os.path.isfile(launch_conf_path):
@@ -99,6 +110,10 @@ def set_launch_configuration(user_name: str, data: dict, **kwargs):
     data["series_id_time_delta"] = kwargs.get("series_id_time_delta")
     data["thread_count"] = kwargs.get("thread_count")
     data["build_annotation_csv"] = kwargs.get("build_annotation_csv")
+    data["distributed"] = kwargs.get("distributed")
+    data["execution_mode"] = kwargs.get("execution_mode")
+    data["prefetch_depth"] = kwargs.get("prefetch_depth")
+    data["emit_previews"] = kwargs.get("emit_previews")
     data["current_user"] = kwargs.get("current_user")
     data["database_info"] = kwargs.get("database_info")
     launch_conf_path = get_launch_config_path(user_name=user_name)
@@ -109,7 +124,10 @@ def set_launch_configuration(user_name: str, data: dict, **kwargs):
         json.dump(data, f, indent=2)
 
 
-def prepare_process_muncher(progress_callback, abort_callback, **kwargs):
+def build_pipeline_processor(progress_callback, abort_callback, **kwargs):
+    from ipso_phen.ipapi.base.pipeline_processor import PipelineProcessor
+    from ipso_phen.ipapi.database.base import DbInfo
+
     dbi = DbInfo.from_json(
         json_data=json.loads(kwargs["database_info"].replace("'", '"'))
     )
@@ -118,7 +136,7 @@ def prepare_process_muncher(progress_callback, abort_callback, **kwargs):
         key="analysis_folder",
         extra=dbi.display_name.lower(),
     )
-    database = db_info_to_database(dbi)
+    database = connections.get(dbi)
     pp = PipelineProcessor(
         dst_path=output_folder,
         overwrite=kwargs["overwrite_existing"],
@@ -130,11 +148,31 @@ def prepare_process_muncher(progress_callback, abort_callback, **kwargs):
     pp.progress_callback = progress_callback
     pp.abort_callback = abort_callback
     pp.ensure_root_output_folder()
+    pp.script = get_compiled_pipeline(
+        kwargs["script"],
+        cache_size=current_app.config["PIPELINE_CACHE_SIZE"],
+    )
+
+    try:
+        pp.multi_thread = int(kwargs.get("thread_count", 1))
+    except:
+        pp.multi_thread = False
+
+    return {
+        "pipeline_processor": pp,
+        "output_folder": output_folder,
+        "database_info": dbi,
+        "database": database,
+    }
+
+
+def prepare_process_muncher(progress_callback, abort_callback, **kwargs):
+    data = build_pipeline_processor(progress_callback, abort_callback, **kwargs)
+    pp = data["pipeline_processor"]
     pp.grab_files_from_data_base(
-        experiment=dbi.display_name.lower(),
-        **database.main_selector,
+        experiment=data["database_info"].display_name.lower(),
+        **data["database"].main_selector,
     )
-    pp.script = LoosePipeline.from_json(json_data=kwargs["script"])
     if not pp.accepted_files:
         return {
             "current": 100,
@@ -143,58 +181,223 @@ def prepare_process_muncher(progress_callback, abort_callback, **kwargs):
             "result": 42,
         }
 
-    try:
-        pp.multi_thread = int(kwargs.get("thread_count", 1))
-    except:
-        pp.multi_thread = False
+    # File handlers are only parsed for the series and the annotation CSV
+    if pp.options.group_by_series or kwargs.get("build_annotation_csv"):
+        metadata = get_metadata_index().get_metadata(
+            files=pp.accepted_files,
+            database=data["database"],
+            workers=get_parser_workers(**kwargs),
+        )
+    else:
+        metadata = None
+    # Series and annotations are built from all the images, as a full run does
+    if pp.options.group_by_series:
+        groups = group_by_series(
+            files=pp.accepted_files,
+            metadata=metadata,
+            time_delta=kwargs["series_id_time_delta"],
+        )
+    else:
+        groups = pp.accepted_files[:]
+    groups_to_process = groups
+    if not kwargs["overwrite_existing"]:
+        result_index = ResultIndex(data["output_folder"])
+        pipeline_hash = get_pipeline_hash(kwargs["script"])
+        # Without entries, existing outputs are skipped by the pipeline processor
+        if result_index.has_results(pipeline_hash):
+            groups_to_process = result_index.filter_unprocessed(
+                files=groups,
+                pipeline_hash=pipeline_hash,
+            )
+            # Outputs left for the remaining images come from another pipeline
+            pp.options.overwrite = True
+    pp.groups_to_process = groups_to_process
 
     return {
         "pipeline_processor": pp,
-        "output_folder": output_folder,
+        "output_folder": data["output_folder"],
+        "database": data["database"],
+        "metadata": metadata,
+        "groups": groups,
+        "groups_to_process": groups_to_process,
+        "prefetcher": get_prefetcher(groups_to_process, data["database"], **kwargs),
     }
 
 
-def generate_annotation_csv(
-    pipeline_processor,
-    groups_to_process,
-    output_folder,
-    di_filename,
-):
+def get_prefetcher(groups: list, database, **kwargs):
+    prefetch_depth = kwargs.get("prefetch_depth") or 0
+    if prefetch_depth <= 0:
+        return None
+    return Prefetcher(
+        groups,
+        prefetch_depth,
+        reader=partial(read_source, database=database),
+    )
+
+
+def get_metadata_index() -> MetadataIndex:
+    return MetadataIndex(current_app.config["METADATA_INDEX_PATH"])
 
+
+def get_parser_workers(**kwargs) -> int:
+    try:
+        return max(1, int(kwargs.get("thread_count", 1)))
+    except (TypeError, ValueError):
+        return 1
+
+
+def execute_groups(data: dict, groups_list: list, **kwargs) -> list:
+    """Processes the groups, returns those whose pipeline succeeded"""
+    succeeded = []
+    prefetcher = data.get("prefetcher")
+    if prefetcher is not None:
+        pp = data["pipeline_processor"]
+        progress_callback = pp.progress_callback
+
+        def prefetch_callback(step, total):
+            prefetcher.advance(step + 1)
+            if progress_callback is not None:
+                progress_callback(step=step, total=total)
+
+        pp.progress_callback = prefetch_callback
+        prefetcher.start()
     try:
-        if pipeline_processor.options.group_by_series:
-            files, luids = map(list, zip(*groups_to_process))
-            wrappers = [
-                file_handler_factory(files[i])
-                for i in [luids.index(x) for x in set(luids)]
-            ]
-        else:
-            wrappers = [file_handler_factory(f) for f in groups_to_process]
-        pd.DataFrame.from_dict(
-            {
-                "plant": [i.plant for i in wrappers],
-                "date_time": [i.date_time for i in wrappers],
-                "disease_index": "",
-            }
-        ).sort_values(
-            by=["plant", "date_time"],
-            axis=0,
-            na_position="first",
-            ascending=True,
-        ).to_csv(
-            di_filename,
-            index=False,
+        engine.process_groups(
+            pipeline_processor=data["pipeline_processor"],
+            groups_list=groups_list,
+            script=kwargs["script"],
+            database=data["database"],
+            processes=kwargs.get("thread_count", 1),
+            mode=kwargs.get("execution_mode", "threads"),
+            succeeded=succeeded,
+            pool_idle_timeout=current_app.config["PROCESS_POOL_IDLE_TIMEOUT"],
+        )
+    finally:
+        if prefetcher is not None:
+            pp.progress_callback = progress_callback
+            prefetcher.close()
+    return succeeded
+
+
+def get_preview_options() -> dict:
+    return dict(
+        folder=current_app.config["PREVIEW_CACHE_PATH"],
+        max_size=current_app.config["PREVIEW_MAX_SIZE"],
+        max_items=current_app.config["PREVIEW_CACHE_MAX_ITEMS"],
+    )
+
+
+def yield_execute_groups(data: dict, groups_list: list, succeeded: list, **kwargs):
+    """Yields progress steps, successful groups are appended to succeeded"""
+    mode = kwargs.get("execution_mode", "threads")
+    progress = engine.yield_process_groups(
+        pipeline_processor=data["pipeline_processor"],
+        groups_list=groups_list,
+        script=kwargs["script"],
+        database=data["database"],
+        processes=kwargs.get("thread_count", 1),
+        # Only the process pool engine can build thumbnails in its workers
+        previews=get_preview_options()
+        if mode == "processes" and kwargs.get("emit_previews")
+        else None,
+        mode=mode,
+        succeeded=succeeded,
+        pool_idle_timeout=current_app.config["PROCESS_POOL_IDLE_TIMEOUT"],
+    )
+    prefetcher = data.get("prefetcher")
+    if prefetcher is None:
+        yield from progress
+        return
+    with prefetcher:
+        for step in progress:
+            prefetcher.advance(step["step"] + 1)
+            yield step
+
+
+def get_merge_options() -> dict:
+    return dict(
+        batch_size=current_app.config["MERGE_BATCH_SIZE"],
+        workers=current_app.config["MERGE_WORKERS"],
+        export_csv=current_app.config["MERGE_EXPORT_CSV"],
+    )
+
+
+def record_processed_groups(output_folder: str, script: dict, groups: list):
+    try:
+        ResultIndex(output_folder).mark_processed(
+            groups=groups,
+            pipeline_hash=get_pipeline_hash(script),
         )
     except Exception as e:
-        logger.exception(f"Unable to build disease index file")
-    else:
-        logger.info("Built disease index file")
+        logger.exception(f"Unable to update result index: {repr(e)}")
+
+
+def create_job(user, launch_conf: dict, executor: str) -> Job:
+    try:
+        experiment = json.loads(launch_conf["database_info"].replace("'", '"'))[
+            "display_name"
+        ]
+    except Exception:
+        experiment = ""
+    job = Job(
+        id=str(uuid.uuid4()),
+        owner=user,
+        executor=executor,
+        experiment=experiment,
+        config=json.dumps(launch_conf),
+    )
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def update_job(job_id: str, **fields):
+    try:
+        job = Job.query.get(job_id)
+        if job is None:
+            return
+        for key, value in fields.items():
+            setattr(job, key, value)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.exception(f"Unable to update job {job_id}: {repr(e)}")
+
+
+def finish_job(job_id: str, state: str, result: dict, **fields) -> dict:
+    update_job(
+        job_id,
+        state=state,
+        finished=datetime.utcnow(),
+        current=result.get("current", 0),
+        total=result.get("total", 1),
+        status=result.get("status", ""),
+        **fields,
+    )
+    return result
+
+
+def fail_job(job_id: str, e: Exception):
+    logger.exception(f"Job {job_id} failed")
+    finish_job(job_id, JOB_FAILURE, {"status": repr(e)[:256]})
 
 
 @celery.task(bind=True)
 def long_task(self, **kwargs):
+    try:
+        return run_long_task(self, **kwargs)
+    except Exception as e:
+        fail_job(kwargs["job_id"], e)
+        raise
+
+
+def run_long_task(task, **kwargs):
+    """Body of long_task, task is the bound Celery task reporting its progress"""
+    job_id = kwargs["job_id"]
+    last_saved = [time.monotonic()]
+
     def progress_callback(step, total):
-        self.update_state(
+        task.update_state(
             state="PROGRESS",
             meta={
                 "current": step,
@@ -202,19 +405,29 @@ def long_task(self, **kwargs):
                 "status": "Analysing images...",
             },
         )
+        if time.monotonic() - last_saved[0] > current_app.config["JOB_SAVE_INTERVAL"]:
+            last_saved[0] = time.monotonic()
+            update_job(job_id, current=step, total=total, status="Analysing images...")
+
+    update_job(
+        job_id,
+        state=JOB_PROGRESS,
+        started=datetime.utcnow(),
+        status="Preparing images...",
+    )
+    cancellation_token = get_cancellation_token(job_id)
 
-    def abort_callback():
-        return os.path.isfile(get_abort_file_path(kwargs["current_user"]))
-
-    data = prepare_process_muncher(progress_callback, abort_callback, **kwargs)
+    data = prepare_process_muncher(progress_callback, cancellation_token, **kwargs)
+    if "pipeline_processor" not in data:
+        return finish_job(job_id, JOB_SUCCESS, data)
 
     pp = data["pipeline_processor"]
     output_folder = data["output_folder"]
-    groups_to_process = pp.prepare_groups(kwargs["series_id_time_delta"])
+    groups_to_process = data["groups_to_process"]
 
     # Generate annotation CSV
     if kwargs["build_annotation_csv"]:
-        self.update_state(
+        task.update_state(
             state="PROGRESS",
             meta={
                 "current": 0,
@@ -223,15 +436,15 @@ def long_task(self, **kwargs):
             },
         )
         generate_annotation_csv(
-            pipeline_processor=pp,
-            groups_to_process=groups_to_process,
-            output_folder=output_folder,
+            groups_to_process=data["groups"],
+            group_by_series=pp.options.group_by_series,
             di_filename=os.path.join(
                 output_folder,
                 f"{kwargs['csv_file_name']}_diseaseindex.csv",
             ),
+            metadata=data["metadata"],
         )
-        self.update_state(
+        task.update_state(
             state="PROGRESS",
             meta={
                 "current": 0,
@@ -241,23 +454,375 @@ def long_task(self, **kwargs):
         )
 
     groups_to_process_count = len(groups_to_process)
-    if groups_to_process_count > 0:
-        pp.process_groups(groups_list=groups_to_process)
-
-    if os.path.isfile(get_abort_file_path(kwargs["current_user"])):
-        return {"current": 100, "total": 100, "status": "Task aborted!", "result": 42}
+    succeeded = []
+    if groups_to_process_count > 0 and kwargs.get("distributed", False):
+        # Chunks build their own pipeline processor, the index may force overwrite
+        result = dispatch_chunks(
+            groups_to_process=groups_to_process,
+            **dict(kwargs, overwrite_existing=pp.options.overwrite),
+        )
+        update_job(job_id, current=0, total=result["total"], status=result["status"])
+        return result
+    elif groups_to_process_count > 0:
+        succeeded = execute_groups(data=data, groups_list=groups_to_process, **kwargs)
+
+    if cancellation_token.is_cancelled(use_cache=False):
+        return finish_job(
+            job_id,
+            JOB_REVOKED,
+            {"current": 100, "total": 100, "status": "Task aborted!", "result": 42},
+        )
+    record_processed_groups(
+        output_folder=output_folder,
+        script=kwargs["script"],
+        groups=succeeded,
+    )
 
     # Merge dataframe
-    pp.merge_result_files(csv_file_name=kwargs["csv_file_name"] + ".csv")
+    from app.merge import merge_result_files
+
+    update_job(job_id, status="Merging data...")
+    output_path = merge_result_files(
+        partials_path=pp.options.partials_path,
+        dst_path=pp.options.dst_path,
+        file_name=kwargs["csv_file_name"],
+        **get_merge_options(),
+    )
+
+    return finish_job(
+        job_id,
+        JOB_SUCCESS,
+        {"current": 100, "total": 100, "status": "Task completed!", "result": 42},
+        output_path=output_path,
+    )
 
-    return {"current": 100, "total": 100, "status": "Task completed!", "result": 42}
 
+def dispatch_chunks(groups_to_process: list, **kwargs) -> dict:
+    chunk_size = max(1, int(celery.conf.get("DISTRIBUTED_CHUNK_SIZE", 200)))
+    chunks = [
+        groups_to_process[i : i + chunk_size]
+        for i in range(0, len(groups_to_process), chunk_size)
+    ]
+    merge_result = chord(
+        process_chunk.s(groups=chunk, **kwargs) for chunk in chunks
+    )(merge_chunks.s(**kwargs))
+    logger.info(f"Dispatched {len(groups_to_process)} groups in {len(chunks)} chunks")
+
+    return {
+        "current": 0,
+        "total": len(groups_to_process),
+        "status": f"Dispatched to {len(chunks)} workers...",
+        "chunks": [res.id for res in merge_result.parent.results],
+        "chunk_sizes": [len(chunk) for chunk in chunks],
+        "merge_id": merge_result.id,
+    }
+
+
+@celery.task(bind=True)
+def process_chunk(self, groups: list, **kwargs):
+    def progress_callback(step, total):
+        self.update_state(
+            state="PROGRESS",
+            meta={
+                "current": step,
+                "total": total,
+                "status": "Analysing images...",
+            },
+        )
+
+    cancellation_token = get_cancellation_token(kwargs["job_id"])
+    try:
+        data = build_pipeline_processor(
+            progress_callback, cancellation_token, **kwargs
+        )
+        # Series are serialized as lists, the pipeline processor expects tuples
+        groups = [tuple(g) if isinstance(g, list) else g for g in groups]
+        data["prefetcher"] = get_prefetcher(groups, data["database"], **kwargs)
+        succeeded = execute_groups(data=data, groups_list=groups, **kwargs)
+    except Exception as e:
+        # The chord will not run merge_chunks, the job ends here
+        fail_job(kwargs["job_id"], e)
+        raise
+    if not cancellation_token.is_cancelled(use_cache=False):
+        record_processed_groups(
+            output_folder=data["output_folder"],
+            script=kwargs["script"],
+            groups=succeeded,
+        )
+
+    return {"current": len(groups), "total": len(groups), "status": "Chunk completed!"}
+
+
+@celery.task(bind=True)
+def merge_chunks(self, chunk_results, **kwargs):
+    job_id = kwargs["job_id"]
+    if get_cancellation_token(job_id).is_cancelled(use_cache=False):
+        return finish_job(
+            job_id,
+            JOB_REVOKED,
+            {"current": 100, "total": 100, "status": "Task aborted!", "result": 42},
+        )
+
+    self.update_state(
+        state="PROGRESS",
+        meta={"current": 0, "total": 100, "status": "Merging data..."},
+    )
+    from app.merge import merge_result_files
+
+    update_job(job_id, status="Merging data...")
+    try:
+        pp = build_pipeline_processor(None, None, **kwargs)["pipeline_processor"]
+        output_path = merge_result_files(
+            partials_path=pp.options.partials_path,
+            dst_path=pp.options.dst_path,
+            file_name=kwargs["csv_file_name"],
+            **get_merge_options(),
+        )
+    except Exception as e:
+        fail_job(job_id, e)
+        raise
+
+    return finish_job(
+        job_id,
+        JOB_SUCCESS,
+        {"current": 100, "total": 100, "status": "Task completed!", "result": 42},
+        output_path=output_path,
+    )
+
+
+def get_distributed_progress(info: dict) -> dict:
+    """Aggregates the progress of all chunks dispatched by long_task"""
+    merge_task = merge_chunks.AsyncResult(info["merge_id"])
+    if merge_task.state == "SUCCESS":
+        return {"state": merge_task.state, **merge_task.info}
+    elif merge_task.state == "FAILURE":
+        return {
+            "state": merge_task.state,
+            "current": 1,
+            "total": 1,
+            "status": str(merge_task.info),
+        }
+    elif merge_task.state == "PROGRESS":
+        return {"state": merge_task.state, **merge_task.info}
+
+    current = 0
+    for chunk_id, chunk_size in zip(info["chunks"], info["chunk_sizes"]):
+        chunk_task = process_chunk.AsyncResult(chunk_id)
+        if chunk_task.state == "SUCCESS":
+            current += chunk_size
+        elif chunk_task.state == "PROGRESS":
+            current += min(chunk_task.info.get("current", 0), chunk_size)
+    total = sum(info["chunk_sizes"])
+
+    return {
+        "state": "PROGRESS",
+        "current": current,
+        "total": total,
+        "status": "Analysing images..." if current < total else "Merging data...",
+    }
+
+
+def get_job_status(job: Job) -> dict:
+    """Live status of a job, from Celery or from its progress channel"""
+    if job.is_finished:
+        response = {"state": job.state, **job.to_dict()}
+        if job.state == JOB_SUCCESS:
+            response["result"] = 42
+        return response
+
+    if job.executor == JOB_STREAM:
+        state = get_progress_channel(job.id).latest_state()
+        return {
+            "state": job.state,
+            "current": state.get("step", job.current),
+            "total": state.get("total", job.total),
+            "status": state.get("header", job.status),
+        }
+
+    task = long_task.AsyncResult(job.id)
+    if task.state == "PENDING":
+        response = {"state": task.state, "current": 0, "total": 1, "status": "Pending..."}
+    elif task.state == "SUCCESS" and "merge_id" in task.info:
+        response = get_distributed_progress(task.info)
+    elif task.state != "FAILURE":
+        response = {
+            "state": task.state,
+            "current": task.info.get("current", 0),
+            "total": task.info.get("total", 1),
+            "status": task.info.get("status", ""),
+        }
+        if "result" in task.info:
+            response["result"] = task.info["result"]
+    else:
+        # something went wrong in the background job
+        response = {
+            "state": task.state,
+            "current": 1,
+            "total": 1,
+            "status": str(task.info),  # this is the exception raised
+        }
+    if response["state"] == JOB_FAILURE:
+        finish_job(job.id, JOB_FAILURE, response)
+    return response
+
+
+def get_cached_job_status(job: Job) -> dict:
+    if job.is_finished:
+        return get_job_status(job)
+    cache_key = f"job_status/{job.id}"
+    status = cache.get(cache_key)
+    if status is None:
+        status = get_job_status(job)
+        cache.set(
+            cache_key,
+            status,
+            timeout=current_app.config["JOB_STATUS_CACHE_TIMEOUT"],
+        )
+    return status
+
+
+def run_streamed_job(job_id: str, **kwargs):
+    """Runs a launch configuration, progress is published to the job's channel"""
+    channel = get_progress_channel(job_id)
+    cancellation_token = get_cancellation_token(job_id)
+    update_job(job_id, state=JOB_PROGRESS, started=datetime.utcnow())
+    try:
+        channel.phase("Building pipeline processor...")
+        data = prepare_process_muncher(None, cancellation_token, **kwargs)
+        if "pipeline_processor" not in data:
+            channel.final(data["status"])
+            finish_job(job_id, JOB_SUCCESS, data)
+            return
+
+        pp = data["pipeline_processor"]
+        output_folder = data["output_folder"]
+        groups_to_process = data["groups_to_process"]
+
+        # Generate annotation CSV
+        if kwargs["build_annotation_csv"]:
+            channel.phase("Generating DI CSV...")
+            generate_annotation_csv(
+                groups_to_process=data["groups"],
+                group_by_series=pp.options.group_by_series,
+                di_filename=os.path.join(
+                    output_folder,
+                    f"{kwargs['csv_file_name']}_diseaseindex.csv",
+                ),
+                metadata=data["metadata"],
+            )
+
+        channel.phase("Analyzing images...", step=0, total=1)
+        succeeded = []
+        for progress in yield_execute_groups(
+            data=data,
+            groups_list=groups_to_process,
+            succeeded=succeeded,
+            **kwargs,
+        ):
+            channel.update(**progress)
+
+        if cancellation_token.is_cancelled(use_cache=False):
+            channel.final("User abort")
+            finish_job(job_id, JOB_REVOKED, {"status": "User abort"})
+            return
+        record_processed_groups(
+            output_folder=output_folder,
+            script=kwargs["script"],
+            groups=succeeded,
+        )
+
+        from app.merge import yield_merge_result_files
+
+        channel.phase("Merging data...", step=0, total=1)
+        update_job(job_id, status="Merging data...")
+        for progress in yield_merge_result_files(
+            partials_path=pp.options.partials_path,
+            dst_path=pp.options.dst_path,
+            file_name=kwargs["csv_file_name"],
+            **get_merge_options(),
+        ):
+            channel.update(step=progress["step"] + 1, total=progress["total"])
+        channel.final("42", step=1, total=1)
+        finish_job(
+            job_id,
+            JOB_SUCCESS,
+            {"current": 1, "total": 1, "status": "Task completed!"},
+            output_path=os.path.join(
+                pp.options.dst_path,
+                f"{kwargs['csv_file_name']}.parquet",
+            ),
+        )
+    except Exception as e:
+        channel.final(f"Task failed: {repr(e)}")
+        fail_job(job_id, e)
+
+
+@celery.task
+def stream_task(job_id: str, **kwargs):
+    run_streamed_job(job_id=job_id, **kwargs)
+
+
+_local_executor = None
+
+
+def _run_streamed_job_in_context(app, job_id: str, launch_conf: dict):
+    with app.app_context():
+        run_streamed_job(job_id=job_id, **launch_conf)
+
+
+def start_streamed_job(job_id: str, launch_conf: dict):
+    global _local_executor
+
+    if current_app.config["STREAM_EXECUTOR"] == "celery":
+        stream_task.apply_async(
+            kwargs=dict(**launch_conf, job_id=job_id),
+            task_id=job_id,
+        )
+    else:
+        if _local_executor is None:
+            _local_executor = ThreadPoolExecutor(
+                max_workers=current_app.config["LOCAL_EXECUTOR_WORKERS"]
+            )
+        _local_executor.submit(
+            _run_streamed_job_in_context,
+            current_app._get_current_object(),
+            job_id,
+            launch_conf,
+        )
+
+
+def get_digest_cache_key(dbi) -> str:
+    return "experiment_digest/" + hashlib.sha1(
+        json.dumps(dbi.to_json(), sort_keys=True).encode("utf-8")
+    ).hexdigest()
+
+
+def build_experiment_digest(dbi):
+    from app.digest import get_database_digest
+
+    return get_database_digest(connections.get(dbi))
+
+
+def get_cached_experiment_digest(dbi):
+    return cached_call(
+        get_digest_cache_key(dbi),
+        lambda: build_experiment_digest(dbi),
+        timeout=current_app.config["DIGEST_CACHE_TIMEOUT"],
+    )
+
+
+def invalidate_experiment_digest(dbi):
+    cache.delete(get_digest_cache_key(dbi))
+    connections.invalidate(dbi)
+
+
+def get_process_info(data: dict, refresh: bool = False) -> dict:
+    from ipso_phen.ipapi.database.base import DbInfo
 
-def get_process_info(data: dict) -> dict:
     dbi = DbInfo.from_json(json_data=json.loads(data["database_info"].replace("'", '"')))
-    tmp_db = db_info_to_database(dbi)
-    tmp_db.connect()
-    count, desc_lines, fig = get_experiment_digest(tmp_db.dataframe)
+    if refresh:
+        invalidate_experiment_digest(dbi)
+    count, desc_lines, fig = get_cached_experiment_digest(dbi)
     return {
         "pipeline_title": data.get("script", {}).get("title", ""),
         "pipeline_desc": data.get("script", {}).get("description", ""),
@@ -267,43 +832,14 @@ def get_process_info(data: dict) -> dict:
         "series_id_time_delta": data.get("series_id_time_delta", ""),
         "thread_count": data.get("thread_count", ""),
         "build_annotation_csv": data.get("build_annotation_csv", ""),
+        "distributed": data.get("distributed", ""),
+        "execution_mode": dict(engine.EXECUTION_MODES).get(
+            data.get("execution_mode", ""), ""
+        ),
+        "prefetch_depth": data.get("prefetch_depth", 0),
+        "emit_previews": data.get("emit_previews", False),
         "experiment": dbi.display_name,
         "obs_count": count,
         "desc_lines": desc_lines,
         "fig": fig,
     }
-
-
-def get_experiment_digest(experiment: pd.DataFrame):
-    df = experiment.copy()
-
-    if df.shape[0] > 0:
-        temp_date_time = pd.DatetimeIndex(df["date_time"])
-        df.insert(loc=4, column="time", value=temp_date_time.time)
-        df.insert(loc=4, column="date", value=temp_date_time.date)
-
-        df["hour"] = pd.to_numeric(
-            df.time.astype("str").str.split(pat=":", expand=True).iloc[:, 0]
-        ).to_list()
-
-        count = df.shape[0]
-
-        desc_lines = {
-            f"{col.replace('_', ' ').capitalize()}s": f"{len(list(df[col].unique()))} unique"
-            for col in ["Plant", "date", "Camera", "view_option"]
-        }
-
-        fig = px.density_heatmap(
-            title="Observations per day and hour",
-            data_frame=df,
-            x="date",
-            y="hour",
-            height=400,
-        )
-        fig.update_yaxes(tick0=-0.5)
-    else:
-        count = 0
-        desc_lines = {col: "None" for col in ["plant", "date", "camera", "view_option"]}
-        fig = None
-
-    return count, desc_lines, fig
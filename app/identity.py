@@ -0,0 +1,87 @@
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event
+from sqlalchemy.orm import make_transient_to_detached
+
+
+class IdentityCache:
+    """Per process cache of the logged in users, for the login user_loader
+
+    Entries hold the column values of the user with its parsed role and group
+    sets and live ttl seconds. Updates and deletions of users in this process
+    invalidate them at once, changes made by other processes are seen once the
+    entry expires. A ttl of 0 disables the cache.
+    """
+
+    def __init__(self, ttl: float = 30, max_size: int = 1024):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        from app.models import User
+
+        self.ttl = app.config["USER_CACHE_TTL"]
+        self.max_size = app.config["USER_CACHE_MAX_SIZE"]
+        if not event.contains(User, "after_update", self._on_user_changed):
+            event.listen(User, "after_update", self._on_user_changed)
+            event.listen(User, "after_delete", self._on_user_changed)
+
+    def _on_user_changed(self, mapper, connection, target):
+        self.invalidate(target.id)
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _get_entry(self, user_id: int):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return entry
+
+    def _put(self, user):
+        values = {c.key: getattr(user, c.key) for c in user.__table__.columns}
+        with self._lock:
+            self._entries[user.id] = (
+                time.monotonic() + self.ttl,
+                values,
+                user.role_set,
+                user.group_set,
+            )
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def load(self, user_id: int):
+        """Returns the user attached to the current session, from cache when possible"""
+        from app import db
+        from app.models import User
+
+        if self.ttl <= 0:
+            return User.query.get(user_id)
+        entry = self._get_entry(user_id)
+        if entry is None:
+            user = User.query.get(user_id)
+            if user is not None:
+                self._put(user)
+            return user
+        _, values, role_set, group_set = entry
+        user = User(**values)
+        make_transient_to_detached(user)
+        # load=False attaches the cached state without querying the database
+        user = db.session.merge(user, load=False)
+        user.set_parsed_sets(role_set, group_set)
+        return user
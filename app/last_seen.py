@@ -0,0 +1,81 @@
+import atexit
+import logging
+import threading
+import time
+
+from sqlalchemy import bindparam
+
+logger = logging.getLogger(__name__)
+
+
+class LastSeenTracker:
+    """Write-behind store of the users' last seen timestamps
+
+    Requests only record the timestamp in memory. Pending timestamps are
+    written in a single bulk UPDATE by the first request coming after
+    flush_interval seconds, and when the process exits. Users whose stored
+    timestamp is less than threshold seconds old are not updated at all.
+    """
+
+    def __init__(self, flush_interval: float = 5, threshold: float = 60):
+        self.flush_interval = flush_interval
+        self.threshold = threshold
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._app = None
+
+    def init_app(self, app):
+        self.flush_interval = app.config["LAST_SEEN_FLUSH_INTERVAL"]
+        self.threshold = app.config["LAST_SEEN_THRESHOLD"]
+        self._app = app
+        atexit.register(self._flush_at_exit)
+
+    def touch(self, user, now):
+        """Records that user was seen at now, a naive UTC datetime"""
+        last_seen = self._pending.get(user.id) or user.last_seen
+        if (
+            last_seen is not None
+            and (now - last_seen).total_seconds() < self.threshold
+        ):
+            return
+        with self._lock:
+            self._pending[user.id] = now
+
+    def flush_if_due(self):
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+        if not pending:
+            return 0
+        from app import db
+        from app.models import User
+
+        users = User.__table__
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(
+                    users.update()
+                    .where(users.c.id == bindparam("user_id"))
+                    .values(last_seen=bindparam("seen")),
+                    [
+                        {"user_id": user_id, "seen": seen}
+                        for user_id, seen in pending.items()
+                    ],
+                )
+        except Exception as e:
+            logger.exception(f"Unable to save last seen timestamps: {repr(e)}")
+            with self._lock:
+                for user_id, seen in pending.items():
+                    self._pending.setdefault(user_id, seen)
+            return 0
+        return len(pending)
+
+    def _flush_at_exit(self):
+        if self._app is not None and self._pending:
+            with self._app.app_context():
+                self.flush()
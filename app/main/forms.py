@@ -11,11 +11,13 @@ from wtforms.validators import (
     ValidationError,
     DataRequired,
     Length,
+    NumberRange,
 )
 from flask_babel import _, lazy_gettext as _l
 from wtforms import FileField
 
 from app.models import User
+from app.engine import EXECUTION_MODES
 
 
 class UploadForm(FlaskForm):
@@ -23,7 +25,6 @@ class UploadForm(FlaskForm):
     upload_data = SubmitField("Configure process >")
     database = SelectField(
         label="Database",
-        choices=[("phenoserre", "Phenoserre"), ("phenopsis", "Phenopsis")],
         validate_choice=False,
     )
 
@@ -37,10 +38,22 @@ class StateProcessOptions(FlaskForm):
         label=f"Allocated threads",
         validate_choice=False,
     )
+    execution_mode = SelectField(
+        label="Execution engine",
+        choices=EXECUTION_MODES,
+        default="threads",
+    )
     overwrite_existing = BooleanField(label=_("Overwrite"))
     build_annotation_csv = BooleanField(label=_("Build annotation CSV"))
+    distributed = BooleanField(label=_("Distribute across workers"))
+    emit_previews = BooleanField(label=_("Result previews (process pool engine)"))
     generate_series_id = BooleanField(label=_("Generate series IDs"))
     series_id_time_delta = IntegerField(label="Max delta for series Id", default=20)
+    prefetch_depth = IntegerField(
+        label="Groups read ahead of analysis (0 to disable)",
+        default=0,
+        validators=[NumberRange(min=0, max=64)],
+    )
 
     back = SubmitField("< Back")
     review = SubmitField("Review >")
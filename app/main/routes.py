@@ -1,14 +1,12 @@
 import os
 from datetime import datetime
-import time
 import logging
-import pathlib
+import time
+import hashlib
 from datetime import datetime as dt
 import multiprocessing as mp
 import json
 
-import plotly
-
 from flask import (
     render_template,
     flash,
@@ -19,12 +17,22 @@ from flask import (
     session,
     jsonify,
     Response,
+    current_app,
+    abort,
+    send_file,
 )
 from flask_login import current_user, login_required
 from flask_babel import _, get_locale
 
-from app import db, jsons
-from app.models import User
+from app import db, jsons, last_seen
+from app.models import (
+    User,
+    Job,
+    JOB_PENDING,
+    JOB_PROGRESS,
+    JOB_QUEUE,
+    JOB_STREAM,
+)
 from app.main import bp
 from app.main.forms import (
     EmptyForm,
@@ -38,13 +46,21 @@ from app.funs import (
     set_launch_configuration,
     long_task,
     get_process_info,
-    get_abort_file_path,
-    prepare_process_muncher,
-    generate_annotation_csv,
+    start_streamed_job,
+    create_job,
+    get_cached_job_status,
 )
 from app.auth.funs import check_user_roles
-
-from ipso_phen.ipapi.database.db_initializer import available_db_dicts, DbType
+from app.database.funs import (
+    get_database_choices,
+    get_database_target,
+    get_experiment_choices,
+)
+from app.cancellation import get_cancellation_token
+from app.progress import get_progress_channel
+from app.events import dumps
+from app.previews import PreviewCache
+from app.pipelines import save_pipeline
 
 logger = logging.getLogger(__name__)
 
@@ -52,8 +68,8 @@ logger = logging.getLogger(__name__)
 @bp.before_app_request
 def before_request():
     if current_user.is_authenticated:
-        current_user.last_seen = datetime.utcnow()
-        db.session.commit()
+        last_seen.touch(current_user, datetime.utcnow())
+    last_seen.flush_if_due()
     g.locale = str(get_locale())
 
 
@@ -70,22 +86,13 @@ def index():
 @check_user_roles(excluded_roles=["pending"])
 @login_required
 def select_pipeline_and_database():
-    upload_form = UploadForm()
+    upload_form = UploadForm(database=session.get("database"))
+    upload_form.database.choices = get_database_choices()
     if upload_form.validate_on_submit() and upload_form.upload_data.data:
         try:
             data = upload_form.input_file.data
-            target_file = f"{current_user.username}_{data.filename}"
             session["loaded_file_name"] = data.filename
-            try:
-                if os.path.isfile(jsons.path(target_file)):
-                    os.remove(jsons.path(target_file))
-            except Exception as e:
-                flash(repr(e), category="error")
-                logger.exception(repr(e))
-            session["pipeline"] = jsons.save(
-                storage=data,
-                name=target_file,
-            )
+            session["pipeline"] = save_pipeline(upload_set=jsons, storage=data)
             session["database"] = upload_form.database.data
         except Exception as e:
             flash(
@@ -120,17 +127,14 @@ def prepare():
         thread_count=data["thread_count"],
         overwrite_existing=data["overwrite_existing"],
         build_annotation_csv=data["build_annotation_csv"],
+        distributed=data.get("distributed", False),
+        execution_mode=data.get("execution_mode", "threads"),
+        prefetch_depth=data.get("prefetch_depth", 0),
+        emit_previews=data.get("emit_previews", False),
+    )
+    process_options_form.experiment.choices = list(
+        get_experiment_choices(get_database_target(session.get("database", "")))
     )
-    db_selected = session.get("database", "")
-    if db_selected == "phenoserre":
-        db_selector = DbType.PHENOSERRE
-    elif db_selected == "phenopsis":
-        db_selector = DbType.PHENOPSIS
-    else:
-        db_selector = DbType.CUSTOM_DB
-    process_options_form.experiment.choices = [
-        (dbi.to_json(), dbi.display_name) for dbi in available_db_dicts[db_selector]
-    ]
 
     process_options_form.thread_count.choices = [
         (str(i), str(i)) for i in range(1, mp.cpu_count())
@@ -146,6 +150,10 @@ def prepare():
             series_id_time_delta=process_options_form.series_id_time_delta.data,
             thread_count=process_options_form.thread_count.data,
             build_annotation_csv=process_options_form.build_annotation_csv.data,
+            distributed=process_options_form.distributed.data,
+            execution_mode=process_options_form.execution_mode.data,
+            prefetch_depth=process_options_form.prefetch_depth.data,
+            emit_previews=process_options_form.emit_previews.data,
             current_user=current_user.username,
             database_info=process_options_form.experiment.data,
         )
@@ -167,7 +175,9 @@ def review():
     if not data:
         flash("No launch configuration data available", category="error")
 
-    launch_info = get_process_info(data)
+    import plotly
+
+    launch_info = get_process_info(data, refresh="refresh" in request.args)
     plot = json.dumps(
         launch_info.pop("fig"),
         cls=plotly.utils.PlotlyJSONEncoder,
@@ -191,75 +201,42 @@ def review():
 @bp.route("/execute", methods=["GET", "POST"])
 @login_required
 def execute():
+    job = Job.query.filter_by(
+        id=session.get("job_id", ""),
+        user_id=current_user.id,
+        executor=JOB_STREAM,
+    ).first()
     return render_template(
         template_name_or_list="execute.html",
         back_link="/revoke_queue",
         use_redis=False,
+        stream_url=url_for("main.execute_task", job_id=job.id) if job else "",
     )
 
 
-@bp.route("/execute_task")
+@bp.route("/start_task", methods=["POST"])
 @login_required
-def execute_task():
-    abort_path = get_abort_file_path(current_user.username)
-    if os.path.isfile(abort_path):
-        os.remove(abort_path)
-
+def start_task():
     launch_conf = get_launch_configuration(current_user.username)
+    job = create_job(user=current_user, launch_conf=launch_conf, executor=JOB_STREAM)
+    session["job_id"] = job.id
+    start_streamed_job(job_id=job.id, launch_conf=launch_conf)
+    return (
+        jsonify({"job_id": job.id}),
+        202,
+        {"Location": url_for("main.execute_task", job_id=job.id)},
+    )
 
-    def abort_callback():
-        return os.path.isfile(abort_path)
-
-    def wrapper():
-        yield f'data: {{"header": "Building pipeline processor..."}}\n\n'
-
-        data = prepare_process_muncher(None, abort_callback, **launch_conf)
-
-        pp = data["pipeline_processor"]
-        output_folder = data["output_folder"]
-
-        time.sleep(0.1)
-        yield f'data: {{"header": "Preparing images..."}}\n\n'
-        for data in pp.yield_groups(launch_conf["series_id_time_delta"]):
-            yield f'data: {{"current":"{data["step"] + 1}","total":"{data["total"]}"}}\n\n'
-        groups_to_process = pp.groups_to_process
-
-        # Generate annotation CSV
-        if launch_conf["build_annotation_csv"]:
-            time.sleep(0.1)
-            yield f'data: {{"header": "Generating DI CSV..."}}\n\n'
-            generate_annotation_csv(
-                pipeline_processor=pp,
-                groups_to_process=groups_to_process,
-                output_folder=output_folder,
-                di_filename=os.path.join(
-                    output_folder,
-                    f"{launch_conf['csv_file_name']}_diseaseindex.csv",
-                ),
-            )
-
-        time.sleep(0.1)
-        yield f'data: {{"header": "Analyzing images...","current":"0","total":"1"}}\n\n'
-        for data in pp.yield_process_groups(groups_list=groups_to_process):
-            # d = f'data: {{"current":"{data["step"] + 1}","total":"{data["total"]}"}}\n\n'
-            yield "data: " + "{" + ",".join(
-                {f'"{k}":"{v}"' for k, v in data.items()}
-            ) + "}\n\n"
-
-        if os.path.isfile(abort_path):
-            time.sleep(0.1)
-            yield f'data: {{"header": "User abort", "close": "true"}}\n\n'
-        else:
-            time.sleep(0.1)
-            yield f'data: {{"header": "Merging data...","current":"0","total":"1"}}\n\n'
-            for data in pp.yield_merge_result_files(
-                csv_file_name=launch_conf["csv_file_name"] + ".csv"
-            ):
-                yield f'data: {{"current":"{data["step"] + 1}","total":"{data["total"]}"}}\n\n'
-            time.sleep(0.1)
-            yield f'data: {{"header": "42", "close": "true"}}\n\n'
 
-    return Response(wrapper(), mimetype="text/event-stream")
+@bp.route("/execute_task/<job_id>")
+@login_required
+def execute_task(job_id):
+    job = Job.query.filter_by(id=job_id, user_id=current_user.id).first_or_404()
+    return Response(
+        get_progress_channel(job.id).listen(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @bp.route("/user/<username>")
@@ -293,48 +270,127 @@ def edit_profile():
 @bp.route("/revoke_queue", methods=["POST"])
 @login_required
 def revoke_queue():
-    pathlib.Path(get_abort_file_path(current_user.username)).touch()
+    if "job_id" in session:
+        get_cancellation_token(session["job_id"]).cancel()
     return redirect(url_for("main.review"))
 
 
 @bp.route("/init_queue", methods=["POST"])
 @login_required
 def init_queue():
-    abort_path = get_abort_file_path(current_user.username)
-    if os.path.isfile(abort_path):
-        os.remove(abort_path)
-    task = long_task.delay(
-        **get_launch_configuration(current_user.username),
+    launch_conf = get_launch_configuration(current_user.username)
+    job = create_job(user=current_user, launch_conf=launch_conf, executor=JOB_QUEUE)
+    long_task.apply_async(
+        kwargs=dict(**launch_conf, job_id=job.id),
+        task_id=job.id,
     )
-    session["task_id"] = task.id
+    session["job_id"] = job.id
     return (
-        jsonify({}),
+        jsonify({"job_id": job.id}),
         202,
-        {"Location": url_for("main.taskstatus", task_id=task.id)},
+        {"Location": url_for("main.taskstatus", job_id=job.id)},
+    )
+
+
+def status_response(load_body):
+    """Serves load_body() with an ETag
+
+    When the client already has the current ETag, waits up to ?wait= seconds
+    for the body to change before answering 304 Not Modified.
+    """
+    wait = min(
+        request.args.get("wait", 0, type=float),
+        current_app.config["JOB_STATUS_MAX_WAIT"],
     )
+    deadline = time.monotonic() + wait
+    while True:
+        body = load_body()
+        etag = hashlib.sha1(dumps(body).encode("utf-8")).hexdigest()
+        if not request.if_none_match.contains(etag) or time.monotonic() >= deadline:
+            break
+        time.sleep(current_app.config["JOB_STATUS_POLL_INTERVAL"])
+        db.session.expire_all()
+    response = jsonify(body)
+    response.set_etag(etag)
+    return response.make_conditional(request)
+
+
+@bp.route("/taskstatus/<job_id>")
+@login_required
+def taskstatus(job_id):
+    job = Job.query.filter_by(id=job_id, user_id=current_user.id).first_or_404()
+    return status_response(lambda: get_cached_job_status(job))
 
 
-@bp.route("/taskstatus/<task_id>")
+@bp.route("/taskstatus", methods=["GET", "POST"])
 @login_required
-def taskstatus(task_id):
-    task = long_task.AsyncResult(task_id)
-    if task.state == "PENDING":
-        response = {"state": task.state, "current": 0, "total": 1, "status": "Pending..."}
-    elif task.state != "FAILURE":
-        response = {
-            "state": task.state,
-            "current": task.info.get("current", 0),
-            "total": task.info.get("total", 1),
-            "status": task.info.get("status", ""),
-        }
-        if "result" in task.info:
-            response["result"] = task.info["result"]
+def tasks_status():
+    if request.method == "POST":
+        job_ids = (request.get_json(silent=True) or {}).get("ids", [])
     else:
-        # something went wrong in the background job
-        response = {
-            "state": task.state,
-            "current": 1,
-            "total": 1,
-            "status": str(task.info),  # this is the exception raised
-        }
-    return jsonify(response)
+        job_ids = [i for i in request.args.get("ids", "").split(",") if i]
+    job_ids = job_ids[: current_app.config["JOB_STATUS_MAX_IDS"]]
+
+    def load_body():
+        jobs = Job.query.filter(
+            Job.id.in_(job_ids),
+            Job.user_id == current_user.id,
+        ).all()
+        return {"jobs": {job.id: get_cached_job_status(job) for job in jobs}}
+
+    return status_response(load_body)
+
+
+@bp.route("/preview/<preview_id>")
+@login_required
+def preview(preview_id):
+    try:
+        file_path = PreviewCache(
+            folder=current_app.config["PREVIEW_CACHE_PATH"],
+            max_items=current_app.config["PREVIEW_CACHE_MAX_ITEMS"],
+        ).get(preview_id)
+    except ValueError:
+        abort(404)
+    if file_path is None:
+        abort(404)
+    response = send_file(
+        os.path.abspath(file_path),
+        mimetype="image/jpeg",
+        conditional=True,
+        max_age=current_app.config["PREVIEW_CACHE_MAX_AGE"],
+    )
+    # Thumbnails never change once written
+    response.cache_control.private = True
+    response.cache_control.public = False
+    response.cache_control.immutable = True
+    return response
+
+
+@bp.route("/jobs")
+@login_required
+def jobs():
+    page = request.args.get("page", 1, type=int)
+    jobs = (
+        current_user.jobs.order_by(Job.created.desc())
+        .paginate(page=page, per_page=current_app.config["JOBS_PER_PAGE"], error_out=False)
+    )
+    return render_template(
+        "jobs.html",
+        title=_("Jobs"),
+        jobs=jobs.items,
+        running_count=current_user.jobs.filter(
+            Job.state.in_([JOB_PENDING, JOB_PROGRESS])
+        ).count(),
+        next_url=url_for("main.jobs", page=jobs.next_num) if jobs.has_next else None,
+        prev_url=url_for("main.jobs", page=jobs.prev_num) if jobs.has_prev else None,
+    )
+
+
+@bp.route("/jobs/<job_id>/cancel", methods=["POST"])
+@login_required
+def cancel_job(job_id):
+    job = Job.query.filter_by(id=job_id, user_id=current_user.id).first_or_404()
+    if not job.is_finished:
+        get_cancellation_token(job.id).cancel()
+        flash(_("Cancellation requested"))
+    return redirect(url_for("main.jobs"))
@@ -0,0 +1,156 @@
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+FRONT_COLUMNS = [
+    "experiment",
+    "plant",
+    "genotype",
+    "condition",
+    "date_time",
+    "camera",
+    "view_option",
+    "luid",
+    "source_path",
+    "area",
+]
+
+
+def list_result_fragments(partials_path: str) -> list:
+    if not os.path.isdir(partials_path):
+        return []
+    return sorted(
+        os.path.join(partials_path, f)
+        for f in os.listdir(partials_path)
+        if f.endswith("_result.csv")
+    )
+
+
+def _read_fragment(csv_file: str):
+    try:
+        return pd.read_csv(csv_file)
+    except pd.errors.EmptyDataError:
+        return None
+    except Exception as e:
+        logger.warning(f"Unable to read {csv_file}: {repr(e)}")
+        return None
+
+
+def _read_column_kinds(csv_file: str) -> dict:
+    """Column name to "numeric", "string", or None when all its values are empty"""
+    dataframe = _read_fragment(csv_file)
+    if dataframe is None:
+        return {}
+    return {
+        col: None
+        if dataframe[col].isna().all()
+        else "numeric"
+        if pd.api.types.is_numeric_dtype(dataframe[col])
+        else "string"
+        for col in dataframe.columns
+    }
+
+
+def _build_schema(fragments: list, executor) -> pa.Schema:
+    """Schema of all the fragments, read once before writing
+
+    A column is float64 when it is numeric in every fragment holding values,
+    it is widened to string as soon as one fragment holds text, and stored as
+    string when no fragment has values for it.
+    """
+    kinds = {}
+    for fragment_kinds in executor.map(_read_column_kinds, fragments):
+        for col, kind in fragment_kinds.items():
+            if kinds.get(col) != "string":
+                kinds[col] = kind or kinds.get(col)
+    front = [col for col in FRONT_COLUMNS if col in kinds]
+    columns = front + [col for col in kinds if col not in front]
+    return pa.schema(
+        [
+            (col, pa.float64() if kinds[col] == "numeric" else pa.string())
+            for col in columns
+        ]
+    )
+
+
+def _conform(dataframe: pd.DataFrame, schema: pa.Schema) -> pa.Table:
+    dataframe = dataframe.reindex(columns=schema.names)
+    for field in schema:
+        if pa.types.is_floating(field.type):
+            # Raises if a fragment changed since the schema was built
+            dataframe[field.name] = pd.to_numeric(dataframe[field.name])
+        else:
+            values = dataframe[field.name]
+            dataframe[field.name] = values.astype(str).where(values.notna(), None)
+    return pa.Table.from_pandas(dataframe, schema=schema, preserve_index=False)
+
+
+def yield_merge_result_files(
+    partials_path: str,
+    dst_path: str,
+    file_name: str,
+    batch_size: int = 500,
+    workers: int = 1,
+    export_csv: bool = True,
+):
+    """Streams per image result fragments into file_name.parquet
+
+    Fragments are read batch_size at a time by workers threads, so memory does
+    not grow with the number of images. They are read once beforehand to build
+    a schema valid for all of them. Rows keep the order of the fragment file
+    names instead of being sorted globally. Yields progress dictionaries.
+    """
+    logger.info("   --- Starting file merging ---")
+    fragments = list_result_fragments(partials_path)
+    total = len(fragments)
+    parquet_path = os.path.join(dst_path, f"{file_name}.parquet")
+    csv_path = os.path.join(dst_path, f"{file_name}.csv")
+    if not fragments:
+        logger.info("   --- Nothing to merge ---")
+        return
+
+    batch_size = max(1, int(batch_size))
+    writer = None
+    write_header = True
+    with ThreadPoolExecutor(max_workers=max(1, int(workers))) as executor:
+        schema = _build_schema(fragments, executor)
+        try:
+            for start in range(0, total, batch_size):
+                batch = fragments[start : start + batch_size]
+                frames = [
+                    df
+                    for df in executor.map(_read_fragment, batch)
+                    if df is not None and not df.empty
+                ]
+                if frames:
+                    dataframe = pd.concat(frames, ignore_index=True)
+                    if writer is None:
+                        writer = pq.ParquetWriter(parquet_path, schema)
+                    table = _conform(dataframe, schema)
+                    writer.write_table(table)
+                    if export_csv:
+                        table.to_pandas().to_csv(
+                            csv_path,
+                            mode="w" if write_header else "a",
+                            header=write_header,
+                            index=False,
+                        )
+                        write_header = False
+                yield {"step": min(start + batch_size, total) - 1, "total": total}
+        finally:
+            if writer is not None:
+                writer.close()
+
+    logger.info("   --- Merged partial outputs ---")
+
+
+def merge_result_files(**kwargs) -> str:
+    for _ in yield_merge_result_files(**kwargs):
+        pass
+    return os.path.join(kwargs["dst_path"], f"{kwargs['file_name']}.parquet")
@@ -0,0 +1,178 @@
+import os
+import sqlite3
+import logging
+from collections import defaultdict, namedtuple
+from datetime import datetime
+
+from billiard import Pool
+
+logger = logging.getLogger(__name__)
+
+FileMetadata = namedtuple(
+    "FileMetadata",
+    ["plant", "camera", "view_option", "date_time", "luid"],
+)
+
+# Database of the pool worker processes, sent once by the initializer
+_worker_database = None
+
+
+def read_file_metadata(file_path: str, database=None) -> FileMetadata:
+    from ipso_phen.ipapi.file_handlers.fh_base import file_handler_factory
+
+    fh = file_handler_factory(file_path, database)
+    return FileMetadata(
+        plant=fh.plant,
+        camera=fh.camera,
+        view_option=fh.view_option,
+        date_time=fh.date_time,
+        luid=fh.luid,
+    )
+
+
+def _init_worker(database):
+    global _worker_database
+    _worker_database = database
+
+
+def _read_in_worker(file_path: str) -> FileMetadata:
+    return read_file_metadata(file_path, _worker_database)
+
+
+def get_file_signature(file_path: str) -> str:
+    """Size and mtime of the file, empty for virtual paths of remote databases"""
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return ""
+    return f"{stat.st_size}|{stat.st_mtime_ns}"
+
+
+def _to_row(file_path: str, signature: str, metadata: FileMetadata) -> tuple:
+    date_time = metadata.date_time
+    return (
+        file_path,
+        signature,
+        None if metadata.plant is None else str(metadata.plant),
+        None if metadata.camera is None else str(metadata.camera),
+        None if metadata.view_option is None else str(metadata.view_option),
+        None if date_time is None else date_time.isoformat(),
+        None if metadata.luid is None else str(metadata.luid),
+    )
+
+
+def _from_row(row: tuple) -> FileMetadata:
+    plant, camera, view_option, date_time, luid = row
+    return FileMetadata(
+        plant=plant,
+        camera=camera,
+        view_option=view_option,
+        date_time=None if date_time is None else datetime.fromisoformat(date_time),
+        luid=luid,
+    )
+
+
+class MetadataIndex:
+    """Persistent cache of what the file handlers extract from image paths
+
+    Entries are keyed by path and invalidated when the size or mtime of the
+    file changes, so each image is only parsed once across runs and users.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        folder = os.path.dirname(db_path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS files (
+                    file_path TEXT PRIMARY KEY,
+                    signature TEXT NOT NULL,
+                    plant TEXT,
+                    camera TEXT,
+                    view_option TEXT,
+                    date_time TEXT,
+                    luid TEXT
+                )"""
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _read(self, conn, files: list, signatures: dict) -> dict:
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS wanted (file_path TEXT)")
+        conn.execute("DELETE FROM wanted")
+        conn.executemany("INSERT INTO wanted VALUES (?)", ((f,) for f in files))
+        return {
+            row[0]: _from_row(row[2:])
+            for row in conn.execute(
+                """SELECT f.file_path, f.signature, f.plant, f.camera,
+                    f.view_option, f.date_time, f.luid
+                FROM files f JOIN wanted w ON f.file_path = w.file_path"""
+            )
+            if row[1] == signatures[row[0]]
+        }
+
+    def get_metadata(
+        self,
+        files: list,
+        database=None,
+        workers: int = 1,
+        chunk_size: int = 1000,
+    ) -> dict:
+        """Returns the metadata of each file, parsing only the ones not indexed"""
+        signatures = {f: get_file_signature(f) for f in files}
+        with self._connect() as conn:
+            metadata = self._read(conn, files, signatures)
+        missing = [f for f in signatures if f not in metadata]
+        if not missing:
+            return metadata
+
+        logger.info(
+            f"Metadata index: {len(metadata)} files known, parsing {len(missing)}"
+        )
+        if workers > 1 and len(missing) > chunk_size:
+            with Pool(
+                processes=workers,
+                initializer=_init_worker,
+                initargs=(database,),
+            ) as pool:
+                parsed = pool.map(_read_in_worker, missing, chunksize=chunk_size)
+        else:
+            parsed = [read_file_metadata(f, database) for f in missing]
+        parsed = dict(zip(missing, parsed))
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (_to_row(f, signatures[f], m) for f, m in parsed.items()),
+            )
+        metadata.update(parsed)
+        return metadata
+
+
+def group_by_series(files: list, metadata: dict, time_delta: int) -> list:
+    """Same grouping as PipelineProcessor.group_by_series, from indexed metadata
+
+    Images of a plant taken less than time_delta minutes after the first image
+    of a series share its luid.
+    """
+    plants = defaultdict(list)
+    for file_path in files:
+        plants[metadata[file_path].plant].append(file_path)
+
+    groups = []
+    for plant_files in plants.values():
+        plant_files.sort(key=lambda f: metadata[f].date_time)
+        main = None
+        for file_path in plant_files:
+            date_time = metadata[file_path].date_time
+            if (
+                main is None
+                or (date_time - metadata[main].date_time).total_seconds() / 60
+                >= time_delta
+            ):
+                main = file_path
+            groups.append((file_path, metadata[main].luid))
+    logger.info(f"{len(files)} files grouped in {len({g[1] for g in groups})} series")
+    return groups
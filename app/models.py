@@ -1,14 +1,16 @@
 from datetime import datetime
 from hashlib import md5
+import json
 from time import time
 from enum import Enum
 
 
 from flask import current_app
 from flask_login import UserMixin
+from sqlalchemy import event
 from werkzeug.security import generate_password_hash, check_password_hash
 import jwt
-from app import db, login, Config
+from app import db, login, identity_cache, Config
 
 # Available roles
 ROLE_SUPER_ADMIN = "super_admin"
@@ -23,6 +25,88 @@ GROUP_OTHERS = "others"
 GROUP_PENDING = "pending"
 AVAILABLE_GROUPS = [GROUP_TPMP, GROUP_OTHERS]
 
+# Experiment database targets, as named by ipso_phen
+DB_TARGET_PHENOSERRE = "phenoserre"
+DB_TARGET_PHENOPSIS = "phenopsis"
+DB_TARGET_PSQL_LOCAL = "psql_local"
+DB_TARGET_SQLITE = "sqlite"
+AVAILABLE_DB_TARGETS = [
+    DB_TARGET_PHENOSERRE,
+    DB_TARGET_PHENOPSIS,
+    DB_TARGET_PSQL_LOCAL,
+    DB_TARGET_SQLITE,
+]
+
+# Job states, same names as Celery's
+JOB_PENDING = "PENDING"
+JOB_PROGRESS = "PROGRESS"
+JOB_SUCCESS = "SUCCESS"
+JOB_FAILURE = "FAILURE"
+JOB_REVOKED = "REVOKED"
+JOB_FINAL_STATES = [JOB_SUCCESS, JOB_FAILURE, JOB_REVOKED]
+
+# Job executors
+JOB_QUEUE = "queue"
+JOB_STREAM = "stream"
+
+
+user_roles = db.Table(
+    "user_roles",
+    db.Column("user_id", db.Integer, db.ForeignKey("user.id"), primary_key=True),
+    db.Column(
+        "role_id", db.Integer, db.ForeignKey("role.id"), primary_key=True, index=True
+    ),
+)
+
+user_groups = db.Table(
+    "user_groups",
+    db.Column("user_id", db.Integer, db.ForeignKey("user.id"), primary_key=True),
+    db.Column(
+        "group_id", db.Integer, db.ForeignKey("group.id"), primary_key=True, index=True
+    ),
+)
+
+
+class NamedEntity:
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(64), index=True, unique=True, nullable=False)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} {self.name}>"
+
+    @classmethod
+    def get_or_create(cls, name: str):
+        item = cls.query.filter_by(name=name).first()
+        if item is None:
+            item = cls(name=name)
+            db.session.add(item)
+        return item
+
+
+class Role(NamedEntity, db.Model):
+    pass
+
+
+class Group(NamedEntity, db.Model):
+    pass
+
+
+class Database(db.Model):
+    """Experiment database server registered by an admin
+
+    ipso_phen's wrappers connect to the server of their target and take no
+    address, so host_address and jump_address are left empty.
+    """
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(64), index=True, unique=True)
+    host_address = db.Column(db.String(64), index=True, unique=True)
+    jump_address = db.Column(db.String(64), index=True, unique=True)
+    target = db.Column(db.String(16), nullable=False, default=DB_TARGET_PHENOSERRE)
+
+    def __repr__(self):
+        return f"<Database {self.name}>"
+
 
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -31,8 +115,19 @@ class User(UserMixin, db.Model):
     password_hash = db.Column(db.String(128))
     about_me = db.Column(db.String(140))
     last_seen = db.Column(db.DateTime, default=datetime.utcnow)
-    roles = db.Column(db.String(120), default=[ROLE_PENDING])
-    groups = db.Column(db.String(120), default=[GROUP_PENDING])
+    roles = db.relationship(
+        "Role",
+        secondary=user_roles,
+        lazy="selectin",
+        backref=db.backref("users", lazy="dynamic"),
+    )
+    groups = db.relationship(
+        "Group",
+        secondary=user_groups,
+        lazy="selectin",
+        backref=db.backref("users", lazy="dynamic"),
+    )
+    jobs = db.relationship("Job", backref="owner", lazy="dynamic")
 
     def __repr__(self):
         return "<User {}>".format(self.username)
@@ -54,11 +149,43 @@ class User(UserMixin, db.Model):
             algorithm="HS256",
         ).decode("utf-8")
 
+    def set_default_access(self):
+        """New users wait in the pending role and group until an admin accepts them"""
+        if not self.roles:
+            self.roles = [Role.get_or_create(ROLE_PENDING)]
+        if not self.groups:
+            self.groups = [Group.get_or_create(GROUP_PENDING)]
+
     def get_roles_as_list(self):
-        return self.roles.split(",") if self.roles else []
+        return sorted(self.role_set)
 
     def get_groups_as_list(self):
-        return self.groups.split(",") if self.groups else []
+        return sorted(self.group_set)
+
+    def set_parsed_sets(self, role_set: frozenset, group_set: frozenset):
+        self._role_set = role_set
+        self._group_set = group_set
+
+    @property
+    def role_set(self) -> frozenset:
+        """Role names, loaded once per instance"""
+        if getattr(self, "_role_set", None) is None:
+            self._role_set = frozenset(r.name for r in self.roles)
+        return self._role_set
+
+    @property
+    def group_set(self) -> frozenset:
+        if getattr(self, "_group_set", None) is None:
+            self._group_set = frozenset(g.name for g in self.groups)
+        return self._group_set
+
+    @staticmethod
+    def with_role(name: str):
+        return User.query.join(User.roles).filter(Role.name == name)
+
+    @staticmethod
+    def in_group(name: str):
+        return User.query.join(User.groups).filter(Group.name == name)
 
     @staticmethod
     def verify_reset_password_token(token):
@@ -71,6 +198,61 @@ class User(UserMixin, db.Model):
         return User.query.get(id)
 
 
+@event.listens_for(User.roles, "append")
+@event.listens_for(User.roles, "remove")
+def _reset_role_set(target, value, initiator):
+    target._role_set = None
+
+
+@event.listens_for(User.groups, "append")
+@event.listens_for(User.groups, "remove")
+def _reset_group_set(target, value, initiator):
+    target._group_set = None
+
+
+class Job(db.Model):
+    id = db.Column(db.String(36), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), index=True)
+    executor = db.Column(db.String(16), default=JOB_QUEUE)
+    state = db.Column(db.String(16), index=True, default=JOB_PENDING)
+    experiment = db.Column(db.String(120))
+    config = db.Column(db.Text)
+    current = db.Column(db.Integer, default=0)
+    total = db.Column(db.Integer, default=1)
+    status = db.Column(db.String(256), default="Pending...")
+    output_path = db.Column(db.String(256))
+    created = db.Column(db.DateTime, index=True, default=datetime.utcnow)
+    started = db.Column(db.DateTime)
+    finished = db.Column(db.DateTime)
+
+    __table_args__ = (db.Index("ix_job_user_id_created", "user_id", "created"),)
+
+    def __repr__(self):
+        return "<Job {}>".format(self.id)
+
+    def get_config(self) -> dict:
+        return json.loads(self.config) if self.config else {}
+
+    @property
+    def is_finished(self) -> bool:
+        return self.state in JOB_FINAL_STATES
+
+    @property
+    def duration(self):
+        if self.started is None:
+            return None
+        return (self.finished or datetime.utcnow()) - self.started
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "state": self.state,
+            "current": self.current,
+            "total": self.total,
+            "status": self.status,
+        }
+
+
 @login.user_loader
 def load_user(id):
-    return User.query.get(int(id))
+    return identity_cache.load(int(id))
@@ -0,0 +1,71 @@
+import os
+import copy
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+from app.result_index import get_pipeline_hash
+
+logger = logging.getLogger(__name__)
+
+_compiled_pipelines = OrderedDict()
+_compiled_pipelines_lock = threading.Lock()
+
+
+def get_content_name(content: bytes, extension: str = "json") -> str:
+    return f"{hashlib.sha256(content).hexdigest()}.{extension}"
+
+
+def save_pipeline(upload_set, storage) -> str:
+    """Stores an uploaded pipeline under the hash of its content
+
+    The same file uploaded twice gives the same name, a changed file a new
+    one, so configurations cached by path can never be stale.
+    """
+    if not upload_set.file_allowed(storage, storage.filename):
+        raise ValueError(f"File type not allowed: {storage.filename}")
+    content = storage.read()
+    json.loads(content)
+    name = get_content_name(content)
+    file_path = upload_set.path(name)
+    if not os.path.isfile(file_path):
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        tmp_path = f"{file_path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, file_path)
+    return name
+
+
+def _compile_pipeline(script: dict):
+    from ipso_phen.ipapi.base.ipt_loose_pipeline import LoosePipeline
+
+    return LoosePipeline.from_json(json_data=script)
+
+
+def get_compiled_pipeline(script: dict, cache_size: int):
+    """Returns the LoosePipeline built from script, compiled once per process
+
+    The process keeps the cache_size last compiled pipelines. They hold the
+    state of their last execution, so callers get their own copy.
+    """
+    key = get_pipeline_hash(script)
+    with _compiled_pipelines_lock:
+        pipeline = _compiled_pipelines.get(key)
+        if pipeline is not None:
+            _compiled_pipelines.move_to_end(key)
+    if pipeline is None:
+        pipeline = _compile_pipeline(script)
+        with _compiled_pipelines_lock:
+            _compiled_pipelines[key] = pipeline
+            while len(_compiled_pipelines) > max(1, cache_size):
+                _compiled_pipelines.popitem(last=False)
+        logger.info(f"Compiled pipeline {key[:8]}")
+    return copy.deepcopy(pipeline)
+
+
+def clear_compiled_pipelines():
+    with _compiled_pipelines_lock:
+        _compiled_pipelines.clear()
@@ -0,0 +1,136 @@
+import os
+import mmap
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = mmap.PAGESIZE
+
+
+def _group_files(group) -> list:
+    if isinstance(group, (tuple, list)):
+        return [group[0]]
+    return [group]
+
+
+def read_file(file_path: str):
+    """Loads a file in the page cache, memory mapped when possible
+
+    Returns the open map, or None when the file is not a local file.
+    """
+    try:
+        f = open(file_path, "rb")
+    except OSError:
+        return None
+    with f:
+        try:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            # Empty files and file systems without mmap support
+            f.read()
+            return None
+    if hasattr(buffer, "madvise"):
+        buffer.madvise(mmap.MADV_WILLNEED)
+    # Touch a byte per page so the data is read now, not when analysed
+    for offset in range(0, len(buffer), PAGE_SIZE):
+        buffer[offset]
+    return buffer
+
+
+def read_source(file_path: str, database=None):
+    """Loads the source image of a group, downloading remote images first
+
+    Phenoserre and phenopsis images are only known by their virtual path, their
+    file handler downloads them to its cache on the mass storage, where the
+    analysis reads them back. Nothing is prefetched for remote images when the
+    mass storage is not available.
+    """
+    if os.path.isfile(file_path):
+        return read_file(file_path)
+
+    from ipso_phen.ipapi.file_handlers.fh_base import file_handler_factory
+
+    fh = file_handler_factory(file_path, database)
+    if not fh.db_linked or not fh.cache_file_path:
+        return None
+    if not os.path.isfile(fh.cache_file_path):
+        fh.load_source_file()
+    return read_file(fh.cache_file_path)
+
+
+class Prefetcher:
+    """Reads the source files of the next depth groups while the current ones are analysed
+
+    A background thread walks groups in processing order and reads the group
+    being analysed plus the depth following ones, as reported by advance(). The
+    maps of prefetched groups are kept in a buffer of the same size, so their
+    pages stay warm until the group is analysed.
+    """
+
+    def __init__(self, groups: list, depth: int, reader=read_source):
+        self.groups = groups
+        self.depth = max(1, depth)
+        self._reader = reader
+        self._buffer = OrderedDict()
+        self._done = 0
+        self._stopped = False
+        self._condition = threading.Condition()
+        self._thread = None
+        self.prefetched = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        for i, group in enumerate(self.groups):
+            with self._condition:
+                self._condition.wait_for(
+                    lambda: self._stopped or i <= self._done + self.depth
+                )
+                if self._stopped:
+                    return
+            try:
+                buffers = [self._reader(f) for f in _group_files(group)]
+            except Exception as e:
+                logger.warning(f"Unable to prefetch {group}: {repr(e)}")
+                buffers = []
+            with self._condition:
+                self._buffer[i] = buffers
+                self._release()
+            self.prefetched += 1
+
+    def _release(self):
+        # Called with the condition held
+        while self._buffer and next(iter(self._buffer)) < self._done:
+            for buffer in self._buffer.popitem(last=False)[1]:
+                if buffer is not None:
+                    buffer.close()
+
+    def advance(self, done: int):
+        """Reports that done groups have been analysed"""
+        with self._condition:
+            if done > self._done:
+                self._done = done
+                self._release()
+                self._condition.notify_all()
+
+    def close(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+        with self._condition:
+            self._done = len(self.groups)
+            self._release()
+        logger.info(f"Prefetched {self.prefetched} of {len(self.groups)} groups")
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,106 @@
+import os
+import re
+import uuid
+import logging
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+
+def make_thumbnail(image, max_size: int = 320, quality: int = 80) -> bytes:
+    """Downscales a BGR image so its largest side is at most max_size, as JPEG"""
+    import cv2
+
+    height, width = image.shape[:2]
+    scale = max_size / max(height, width)
+    if scale < 1:
+        image = cv2.resize(
+            image,
+            (max(1, int(width * scale)), max(1, int(height * scale))),
+            interpolation=cv2.INTER_AREA,
+        )
+    ok, buffer = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise ValueError("Unable to encode thumbnail")
+    return buffer.tobytes()
+
+
+def get_result_image(script):
+    """The mosaic of the last pipeline execution or, without mosaic, its last image"""
+    mosaic = getattr(script, "mosaic", None)
+    if getattr(mosaic, "shape", None) is not None:
+        return mosaic
+    wrapper = getattr(script, "wrapper", None)
+    return None if wrapper is None else wrapper.current_image
+
+
+class PreviewCache:
+    """Bounded on-disk store of result thumbnails
+
+    Thumbnails are written by the workers under a random id and never change,
+    the least recently served ones are removed by trim() once max_items is
+    exceeded.
+    """
+
+    def __init__(self, folder: str, max_items: int = 500):
+        self.folder = folder
+        self.max_items = max_items
+        os.makedirs(folder, exist_ok=True)
+
+    def path(self, preview_id: str) -> str:
+        if not PREVIEW_ID_PATTERN.match(preview_id):
+            raise ValueError(f"Invalid preview id: {preview_id}")
+        return os.path.join(self.folder, f"{preview_id}.jpg")
+
+    def put(self, data: bytes) -> str:
+        preview_id = uuid.uuid4().hex
+        file_path = self.path(preview_id)
+        tmp_path = f"{file_path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, file_path)
+        return preview_id
+
+    def get(self, preview_id: str):
+        """Returns the path of the thumbnail and marks it as recently used"""
+        file_path = self.path(preview_id)
+        try:
+            os.utime(file_path)
+        except OSError:
+            return None
+        return file_path
+
+    def trim(self):
+        entries = []
+        with os.scandir(self.folder) as it:
+            for entry in it:
+                if entry.name.endswith(".jpg"):
+                    try:
+                        entries.append((entry.stat().st_mtime, entry.path))
+                    except OSError:
+                        pass
+        if len(entries) <= self.max_items:
+            return 0
+        entries.sort()
+        removed = 0
+        for _, file_path in entries[: len(entries) - self.max_items]:
+            try:
+                os.remove(file_path)
+                removed += 1
+            except OSError:
+                pass
+        logger.info(f"Preview cache: removed {removed} thumbnails")
+        return removed
+
+
+def store_preview(script, folder: str, max_size: int = 320):
+    """Thumbnail of the last result of script, returns its id or None"""
+    try:
+        image = get_result_image(script)
+        if image is None:
+            return None
+        return PreviewCache(folder).put(make_thumbnail(image, max_size=max_size))
+    except Exception as e:
+        logger.warning(f"Unable to build preview: {repr(e)}")
+        return None
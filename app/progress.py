@@ -0,0 +1,82 @@
+import json
+
+from flask import current_app
+
+from app.events import ProgressEmitter, dumps, format_event
+from app.stores import get_store
+
+PROGRESS_STATE_TIMEOUT = 60 * 60 * 24
+
+
+class ProgressChannel:
+    """Publishes the accumulated progress state of a job to its subscribers
+
+    Every message carries the full state so a subscriber that missed messages,
+    or reconnects, only needs the latest one. Updates are rate limited like the
+    server sent events they end up in.
+    """
+
+    def __init__(self, job_id: str, store, max_rate: float = 4):
+        self.job_id = job_id
+        self._store = store
+        self._emitter = ProgressEmitter(max_rate=max_rate)
+        self.state = {}
+
+    @property
+    def channel(self) -> str:
+        return f"ipso:progress:{self.job_id}"
+
+    @property
+    def state_key(self) -> str:
+        return f"ipso:progress:{self.job_id}:state"
+
+    def _publish(self):
+        self._emitter.mark_emitted()
+        message = dumps(self.state)
+        self._store.set(self.state_key, message, timeout=PROGRESS_STATE_TIMEOUT)
+        self._store.publish(self.channel, message)
+
+    def update(self, **data):
+        self.state.update(data)
+        if self._emitter.ready():
+            self._publish()
+
+    def phase(self, header: str, **data):
+        self.state.update(dict(header=header, **data))
+        self._publish()
+
+    def final(self, header: str, **data):
+        self.state.update(dict(header=header, close=True, **data))
+        self._publish()
+
+    def latest_state(self) -> dict:
+        message = self._store.get(self.state_key)
+        return json.loads(message) if message else {}
+
+    def listen(self, keepalive: float = 15):
+        """Yields server sent events, starting with the latest known state"""
+        subscription = self._store.subscribe(self.channel)
+        try:
+            state = self.latest_state()
+            if state:
+                yield format_event(state)
+                if state.get("close", False):
+                    return
+            while True:
+                message = subscription.get(timeout=keepalive)
+                if message is None:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"data: {message}\n\n"
+                if json.loads(message).get("close", False):
+                    return
+        finally:
+            subscription.close()
+
+
+def get_progress_channel(job_id: str) -> ProgressChannel:
+    return ProgressChannel(
+        job_id=job_id,
+        store=get_store(),
+        max_rate=current_app.config["SSE_MAX_EVENTS_PER_SECOND"],
+    )
@@ -0,0 +1,96 @@
+import os
+import json
+import hashlib
+import sqlite3
+import logging
+
+logger = logging.getLogger(__name__)
+
+RESULT_INDEX_FILE_NAME = "result_index.db"
+# Changes with get_image_hash, entries hashed another way are dropped
+RESULT_INDEX_VERSION = 2
+
+
+def get_pipeline_hash(script: dict) -> str:
+    return hashlib.sha1(
+        json.dumps(script, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+
+
+def get_image_hash(file_path: str) -> str:
+    """Hashes the file name and, when the file is reachable, its size and mtime
+
+    The folder is left out so moved images keep their hash. Images served by
+    remote databases only have a virtual path, whose file name holds the
+    experiment, plant, date and camera and identifies the image alone.
+    """
+    signature = os.path.basename(file_path)
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        pass
+    else:
+        signature = f"{signature}|{stat.st_size}|{stat.st_mtime_ns}"
+    return hashlib.sha1(signature.encode("utf-8")).hexdigest()
+
+
+def _group_file_path(group) -> str:
+    return group[0] if isinstance(group, (tuple, list)) else group
+
+
+class ResultIndex:
+    """Persistent record of the images already analysed by each pipeline"""
+
+    def __init__(self, output_folder: str):
+        self.db_path = os.path.join(output_folder, RESULT_INDEX_FILE_NAME)
+        with self._connect() as conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS results (
+                    image_hash TEXT NOT NULL,
+                    pipeline_hash TEXT NOT NULL,
+                    file_path TEXT,
+                    PRIMARY KEY (image_hash, pipeline_hash)
+                )"""
+            )
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version != RESULT_INDEX_VERSION:
+                conn.execute("DELETE FROM results")
+                conn.execute(f"PRAGMA user_version = {RESULT_INDEX_VERSION}")
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def has_results(self, pipeline_hash: str) -> bool:
+        with self._connect() as conn:
+            return (
+                conn.execute(
+                    "SELECT 1 FROM results WHERE pipeline_hash = ? LIMIT 1",
+                    (pipeline_hash,),
+                ).fetchone()
+                is not None
+            )
+
+    def filter_unprocessed(self, files: list, pipeline_hash: str) -> list:
+        with self._connect() as conn:
+            done = {
+                row[0]
+                for row in conn.execute(
+                    "SELECT image_hash FROM results WHERE pipeline_hash = ?",
+                    (pipeline_hash,),
+                )
+            }
+        if not done:
+            return files
+        kept = [f for f in files if get_image_hash(_group_file_path(f)) not in done]
+        logger.info(f"Result index: {len(files) - len(kept)} images already analysed")
+        return kept
+
+    def mark_processed(self, groups: list, pipeline_hash: str):
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?)",
+                (
+                    (get_image_hash(file_path), pipeline_hash, file_path)
+                    for file_path in map(_group_file_path, groups)
+                ),
+            )
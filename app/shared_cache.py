@@ -0,0 +1,127 @@
+import os
+import time
+import pickle
+import hashlib
+import logging
+import threading
+
+from flask import current_app
+
+from app import cache
+
+logger = logging.getLogger(__name__)
+
+# Serialises lock acquisition of backends without an atomic add, within a process
+_local_lock = threading.Lock()
+
+
+class SingleFlight:
+    """Makes sure only one process computes a missing cache entry
+
+    The others wait for the entry to show up, or for the lock to expire if the
+    process holding it died. Redis locks use the atomic add of the backend,
+    filesystem ones an exclusively created lock file in a folder next to the
+    cache folder.
+    """
+
+    def __init__(
+        self,
+        cache,
+        lock_timeout: float = 120,
+        wait_interval: float = 0.1,
+        max_entry_size: int = 0,
+    ):
+        self.cache = cache
+        self.lock_timeout = lock_timeout
+        self.wait_interval = wait_interval
+        self.max_entry_size = max_entry_size
+
+    def _lock_path(self, key: str):
+        cache_dir = getattr(self.cache.cache, "_path", None)
+        if cache_dir is None:
+            return None
+        # Kept out of the cache folder, whose files all count as entries
+        lock_dir = os.path.normpath(cache_dir) + "_locks"
+        os.makedirs(lock_dir, exist_ok=True)
+        return os.path.join(
+            lock_dir,
+            hashlib.md5(key.encode("utf-8")).hexdigest() + ".lock",
+        )
+
+    def _acquire(self, key: str) -> bool:
+        lock_path = self._lock_path(key)
+        if lock_path is None:
+            with _local_lock:
+                return self.cache.add(
+                    f"{key}/lock",
+                    os.getpid(),
+                    timeout=int(self.lock_timeout),
+                )
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock_path) > self.lock_timeout:
+                    logger.warning(f"Removing stale cache lock for {key}")
+                    os.remove(lock_path)
+            except OSError:
+                pass
+            return False
+        os.close(fd)
+        return True
+
+    def _release(self, key: str):
+        lock_path = self._lock_path(key)
+        if lock_path is None:
+            self.cache.delete(f"{key}/lock")
+            return
+        try:
+            os.remove(lock_path)
+        except OSError:
+            pass
+
+    def _store(self, key: str, value, timeout: int):
+        if self.max_entry_size:
+            size = len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+            if size > self.max_entry_size:
+                logger.warning(f"Not caching {key}, {size} bytes is above the limit")
+                return
+        self.cache.set(key, value, timeout=timeout)
+
+    def get_or_compute(self, key: str, compute, timeout: int = None):
+        value = self.cache.get(key)
+        if value is not None:
+            return value
+        deadline = time.monotonic() + self.lock_timeout
+        while True:
+            if self._acquire(key):
+                try:
+                    # Computed while we were waiting for the lock
+                    value = self.cache.get(key)
+                    if value is None:
+                        value = compute()
+                        self._store(key, value, timeout)
+                    return value
+                finally:
+                    self._release(key)
+            time.sleep(self.wait_interval)
+            value = self.cache.get(key)
+            if value is not None:
+                return value
+            if time.monotonic() > deadline:
+                logger.warning(f"Timeout waiting for {key}, computing it anyway")
+                return compute()
+
+
+def get_single_flight() -> SingleFlight:
+    return SingleFlight(
+        cache=cache,
+        lock_timeout=current_app.config["CACHE_LOCK_TIMEOUT"],
+        wait_interval=current_app.config["CACHE_LOCK_WAIT_INTERVAL"],
+        max_entry_size=current_app.config["CACHE_MAX_ENTRY_SIZE"],
+    )
+
+
+def cached_call(key: str, compute, timeout: int = None):
+    """Returns the cached value of key, computed by a single process when missing"""
+    return get_single_flight().get_or_compute(key, compute, timeout=timeout)
@@ -0,0 +1,246 @@
+import os
+import time
+import uuid
+import logging
+import threading
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from werkzeug.utils import secure_filename
+
+logger = logging.getLogger(__name__)
+
+# Columns of the pandas catalogs built by ipso_phen, Date and Time are added on connect
+CATALOG_COLUMNS = [
+    "Luid",
+    "Experiment",
+    "Plant",
+    "date_time",
+    "Camera",
+    "view_option",
+    "FilePath",
+    "blob_path",
+]
+
+# Copy of the query and wrangling of ipso_phen's phenoserre_wrapper.get_exp_as_df
+# (checked against ipso_phen 0.7.112), with a lower bound on the time stamp it
+# does not accept. Snapshot rows are matched to fresh catalogs by Luid and
+# FilePath, both must stay built exactly as upstream builds them:
+# tests/test_catalog_snapshots.py compares the two on a sample. Drop the copy
+# once get_exp_as_df takes a since argument.
+_PHENOSERRE_QUERY = """select
+                    s.measurement_label as Experiment,
+                    s.id_tag as Plant,
+                    ti.camera_label as cam_view_option,
+                    s.time_stamp as date_time,
+                    file.path as blob_path
+                from
+                    snapshot as s, tiled_image as ti, tile as t, image_file_table as file
+                where
+                    s.measurement_label = '{exp_name}' and
+                    s.time_stamp >= '{since}' and
+                    s.id = ti.snapshot_id and
+                    ti.id = t.tiled_image_id and
+                    t.raw_image_oid = file.id
+                order by s.time_stamp asc"""
+
+
+def build_phenoserre_catalog(dataframe: pd.DataFrame) -> pd.DataFrame:
+    """Catalog built from the rows of _PHENOSERRE_QUERY, as get_exp_as_df does"""
+    from ipso_phen.ipapi.database.phenoserre_wrapper import _split_camera_label
+
+    if dataframe.shape[0] == 0:
+        return pd.DataFrame(columns=CATALOG_COLUMNS)
+    dataframe = dataframe.reset_index(drop=True)
+    dataframe["Experiment"] = dataframe["experiment"].str.lower()
+    dataframe["Plant"] = dataframe["plant"].str.lower()
+    dataframe["cam_view_option"] = dataframe["cam_view_option"].str.lower()
+    dataframe["date_time"] = pd.to_datetime(dataframe["date_time"], utc=True)
+    dataframe[["Camera", "view_option"]] = (
+        dataframe["cam_view_option"].apply(_split_camera_label).apply(pd.Series)
+    )
+    experiment, plant = dataframe["Experiment"], dataframe["Plant"]
+    camera, view_option = dataframe["Camera"], dataframe["view_option"]
+    dataframe["FilePath"] = (
+        experiment
+        + "/("
+        + plant
+        + ")--("
+        + dataframe["date_time"].dt.strftime("%Y-%m-%d %H_%M_%S")
+        + ")--("
+        + experiment
+        + ")--("
+        + camera
+        + "-"
+        + view_option
+        + ").png"
+    )
+    dataframe["Luid"] = (
+        experiment
+        + "_"
+        + plant
+        + "_"
+        + dataframe["date_time"].dt.strftime("%Y%m%d%H%M%S")
+        + "_"
+        + camera
+        + "_"
+        + view_option
+    )
+    dataframe["blob_path"] = dataframe["blob_path"].map(
+        "./ftp/LemnaTecOptimalogTest/{}".format
+    )
+    return dataframe[CATALOG_COLUMNS]
+
+
+def fetch_phenoserre_rows(wrapper, since) -> pd.DataFrame:
+    """Images taken since a timestamp"""
+    from ipso_phen.ipapi.database.phenoserre_wrapper import _query_phenoserre
+
+    return build_phenoserre_catalog(
+        _query_phenoserre(
+            query=_PHENOSERRE_QUERY.format(
+                exp_name=wrapper.db_info.display_name,
+                since=since.isoformat(),
+            )
+        )
+    )
+
+
+def fetch_all_rows(wrapper, since) -> pd.DataFrame:
+    """Whole catalog, for backends that can not filter it remotely"""
+    dataframe = wrapper.df_builder(wrapper.db_info.display_name)
+    if since is not None:
+        dataframe = dataframe[pd.to_datetime(dataframe["date_time"]) >= since]
+    return dataframe
+
+
+# Targets able to send only the images taken since the last snapshot
+INCREMENTAL_FETCHERS = {"phenoserre": fetch_phenoserre_rows}
+
+
+class CatalogSnapshots:
+    """Local Arrow copies of the image catalogs of remote experiments
+
+    A snapshot older than refresh_interval seconds is refreshed with the images
+    taken since its most recent one, appended to it. Snapshots are uncompressed
+    Arrow IPC files, memory mapped when read, and replaced atomically so
+    processes reading the previous version are not disturbed. The first
+    snapshot of an experiment starts from ipso_phen's CSV cache when present.
+    """
+
+    def __init__(self, folder: str, refresh_interval: float = 300):
+        self.folder = folder
+        self.refresh_interval = refresh_interval
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def get_path(self, dbi) -> str:
+        return os.path.join(
+            self.folder,
+            dbi.target,
+            secure_filename(dbi.display_name.lower()) + ".arrow",
+        )
+
+    def is_stale(self, dbi) -> bool:
+        try:
+            age = time.time() - os.path.getmtime(self.get_path(dbi))
+        except OSError:
+            return True
+        return age >= self.refresh_interval
+
+    def read(self, path: str) -> pa.Table:
+        with pa.memory_map(path, "r") as source:
+            return pa.ipc.open_file(source).read_all()
+
+    def _write(self, path: str, table: pa.Table):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with pa.OSFile(tmp_path, "wb") as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    @staticmethod
+    def _from_pandas(dataframe: pd.DataFrame, schema=None) -> pa.Table:
+        columns = [c for c in CATALOG_COLUMNS if c in dataframe.columns]
+        dataframe = dataframe[columns].copy()
+        dataframe["date_time"] = pd.to_datetime(dataframe["date_time"])
+        return pa.Table.from_pandas(dataframe, schema=schema, preserve_index=False)
+
+    def _initial_rows(self, wrapper) -> pd.DataFrame:
+        dataframe = wrapper.connect_from_cache()
+        if dataframe is None:
+            dataframe = wrapper.df_builder(wrapper.db_info.display_name)
+        return dataframe
+
+    def refresh(self, wrapper) -> pa.Table:
+        """Brings the snapshot of the wrapper's experiment up to date and returns it"""
+        dbi = wrapper.db_info
+        path = self.get_path(dbi)
+        table = self.read(path) if os.path.isfile(path) else None
+        fetch_newer = INCREMENTAL_FETCHERS.get(dbi.target, fetch_all_rows)
+        start = time.monotonic()
+        if table is None or table.num_rows == 0:
+            table = self._from_pandas(self._initial_rows(wrapper))
+            added = table.num_rows
+        else:
+            since = pc.max(table["date_time"]).as_py()
+            rows = fetch_newer(wrapper, since)
+            try:
+                newer = self._from_pandas(rows, table.schema)
+            except (KeyError, pa.ArrowInvalid, pa.ArrowTypeError) as e:
+                # Columns changed upstream, start again from the whole catalog
+                logger.warning(f"Rebuilding {dbi.display_name} snapshot: {repr(e)}")
+                table = self._from_pandas(fetch_all_rows(wrapper, None))
+                added = table.num_rows
+            else:
+                # Images taken exactly at since are already in the snapshot
+                newer = newer.filter(
+                    pc.invert(pc.is_in(newer["Luid"], value_set=table["Luid"]))
+                )
+                added = newer.num_rows
+                if added:
+                    table = pa.concat_tables([table, newer])
+        if added or not os.path.isfile(path):
+            self._write(path, table)
+        else:
+            os.utime(path)
+        logger.info(
+            f"Snapshot of {dbi.display_name}: {added} new images,"
+            f" {table.num_rows} in total, {time.monotonic() - start:.2f}s"
+        )
+        return table
+
+    def _get_lock(self, path: str) -> threading.Lock:
+        with self._lock:
+            return self._locks.setdefault(path, threading.Lock())
+
+    def load(self, wrapper) -> pd.DataFrame:
+        dbi = wrapper.db_info
+        path = self.get_path(dbi)
+        with self._get_lock(path):
+            if self.is_stale(dbi):
+                try:
+                    self.refresh(wrapper)
+                except Exception as e:
+                    if not os.path.isfile(path):
+                        raise
+                    logger.exception(
+                        f"Unable to refresh {dbi.display_name},"
+                        f" using its last snapshot: {repr(e)}"
+                    )
+            table = self.read(path)
+        return table.to_pandas(split_blocks=True)
+
+    def connect(self, wrapper):
+        """Loads the wrapper's catalog from its snapshot, as PandasDbWrapper.connect does"""
+        dataframe = self.load(wrapper)
+        date_time = pd.DatetimeIndex(dataframe["date_time"])
+        dataframe.insert(loc=4, column="Time", value=date_time.time)
+        dataframe.insert(loc=4, column="Date", value=date_time.date)
+        wrapper.dataframe = dataframe
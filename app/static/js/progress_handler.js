@@ -18,30 +18,46 @@ function start_long_task() {
     });
 }
 
-function update_progress(status_url) {
-    // send GET request to status URL
-    $.getJSON(status_url, function (data) {
-        // update UI
-        if ('current' in data) {
-            percent = parseInt(data.current * 100 / data.total);
-            pb = document.getElementById("progress-bar").style.width = percent + "%";
-            document.getElementById("progress-label").innerHTML = percent + '% - ' + data['current'] + '/' + data['total'];
-        }
-        if (data.state != 'PENDING' && data.state != 'PROGRESS') {
-            if ('result' in data) {
-                // show result
-                $('#progress-header').text('Result: ' + data.result);
+function update_progress(status_url, etag) {
+    // long poll the status URL, answers 304 if nothing changed within the wait time
+    $.ajax({
+        type: 'GET',
+        url: status_url,
+        data: { wait: 20 },
+        dataType: 'json',
+        headers: etag ? { 'If-None-Match': etag } : {},
+        complete: function (request) {
+            if (request.status == 304) {
+                update_progress(status_url, etag);
+                return;
+            }
+            if (request.status != 200) {
+                // rerun in 2 seconds
+                setTimeout(function () {
+                    update_progress(status_url, etag);
+                }, 2000);
+                return;
+            }
+            var data = request.responseJSON;
+            // update UI
+            if ('current' in data) {
+                percent = parseInt(data.current * 100 / data.total);
+                pb = document.getElementById("progress-bar").style.width = percent + "%";
+                document.getElementById("progress-label").innerHTML = percent + '% - ' + data['current'] + '/' + data['total'];
+            }
+            if (data.state != 'PENDING' && data.state != 'PROGRESS') {
+                if ('result' in data) {
+                    // show result
+                    $('#progress-header').text('Result: ' + data.result);
+                } else {
+                    // something unexpected happened
+                    $('#progress-header').text('Result: ' + data.state);
+                }
+                $('#back-cancel').text("< Back");
+                document.getElementById("start-bg-job").className = ("btn btn-primary active");
             } else {
-                // something unexpected happened
-                $('#progress-header').text('Result: ' + data.state);
+                update_progress(status_url, request.getResponseHeader('ETag'));
             }
-            $('#back-cancel').text("< Back");
-            document.getElementById("start-bg-job").className = ("btn btn-primary active");
-        } else {
-            // rerun in 2 seconds
-            setTimeout(function () {
-                update_progress(status_url);
-            }, 2000);
         }
     });
-}
\ No newline at end of file
+}
@@ -0,0 +1,125 @@
+import threading
+import time
+
+from flask import current_app
+
+
+class LocalSubscription:
+    """Only the latest message published since the previous get is delivered"""
+
+    def __init__(self, store, channel: str):
+        self._store = store
+        self._channel = channel
+        self._last_seq = store._channel_state(channel)[0]
+
+    def get(self, timeout: float = None):
+        with self._store._condition:
+            self._store._condition.wait_for(
+                lambda: self._store._channel_state(self._channel)[0] != self._last_seq,
+                timeout=timeout,
+            )
+            seq, message = self._store._channel_state(self._channel)
+        if seq == self._last_seq:
+            return None
+        self._last_seq = seq
+        return message
+
+    def close(self):
+        pass
+
+
+class LocalStore:
+    """In process stand-in for the Redis store, only shared between threads"""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+        self._channels = {}
+        self._condition = threading.Condition()
+
+    def get(self, key: str):
+        with self._lock:
+            value, expires = self._data.get(key, (None, None))
+            if expires is not None and expires < time.monotonic():
+                self._data.pop(key, None)
+                return None
+            return value
+
+    def set(self, key: str, value: str, timeout: int = None):
+        with self._lock:
+            self._data[key] = (
+                value,
+                None if not timeout else time.monotonic() + timeout,
+            )
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def _channel_state(self, channel: str) -> tuple:
+        return self._channels.get(channel, (0, None))
+
+    def publish(self, channel: str, message: str):
+        with self._condition:
+            seq, _ = self._channel_state(channel)
+            self._channels[channel] = (seq + 1, message)
+            self._condition.notify_all()
+
+    def subscribe(self, channel: str) -> LocalSubscription:
+        return LocalSubscription(self, channel)
+
+
+class RedisSubscription:
+    def __init__(self, client, channel: str):
+        self._pubsub = client.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.subscribe(channel)
+
+    def get(self, timeout: float = None):
+        message = self._pubsub.get_message(timeout=timeout)
+        return None if message is None else message["data"]
+
+    def close(self):
+        self._pubsub.close()
+
+
+class RedisStore:
+    """Store shared by all web and worker processes through Redis"""
+
+    def __init__(self, url: str):
+        from redis import Redis
+
+        self._client = Redis.from_url(url, decode_responses=True)
+
+    def get(self, key: str):
+        return self._client.get(key)
+
+    def set(self, key: str, value: str, timeout: int = None):
+        self._client.set(key, value, ex=timeout or None)
+
+    def delete(self, key: str):
+        self._client.delete(key)
+
+    def publish(self, channel: str, message: str):
+        self._client.publish(channel, message)
+
+    def subscribe(self, channel: str) -> RedisSubscription:
+        return RedisSubscription(self._client, channel)
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(url: str = ""):
+    """Returns the store matching url, defaults to STATE_STORE_URL
+
+    Anything not starting with redis:// gives a LocalStore.
+    """
+    url = url or current_app.config["STATE_STORE_URL"]
+    with _stores_lock:
+        if url not in _stores:
+            if url.startswith(("redis://", "rediss://", "unix://")):
+                _stores[url] = RedisStore(url)
+            else:
+                _stores[url] = LocalStore()
+        return _stores[url]
@@ -0,0 +1,78 @@
+import logging
+from contextlib import contextmanager
+from timeit import default_timer as timer
+
+logger = logging.getLogger(__name__)
+
+
+@contextmanager
+def _timed(timings: dict, name: str):
+    start = timer()
+    try:
+        yield
+    except Exception as e:
+        logger.exception(f"Warm-up step {name} failed: {repr(e)}")
+    finally:
+        timings[name] = timer() - start
+
+
+def _import_pipeline_machinery():
+    from ipso_phen.ipapi.base import pipeline_processor, ipt_loose_pipeline
+    from ipso_phen.ipapi.file_handlers import fh_base
+    from ipso_phen.ipapi.database import db_factory, db_initializer
+
+
+def _load_tool_registry():
+    from ipso_phen.ipapi.base.ipt_holder import IptHolder
+
+    return len(IptHolder().ipt_list)
+
+
+def _init_opencv():
+    import cv2
+    import numpy as np
+
+    image = np.zeros((16, 16, 3), dtype=np.uint8)
+    cv2.imencode(".jpg", cv2.resize(image, (8, 8), interpolation=cv2.INTER_AREA))
+
+
+def _preload_catalogs(experiments: list):
+    from ipso_phen.ipapi.database.db_initializer import available_db_dicts
+    from app import connections
+    from app.funs import get_cached_experiment_digest
+
+    experiments = {e.lower() for e in experiments}
+    loaded = 0
+    for dbis in available_db_dicts.values():
+        for dbi in dbis:
+            if dbi.display_name.lower() in experiments:
+                connections.get(dbi)
+                get_cached_experiment_digest(dbi)
+                loaded += 1
+    return loaded
+
+
+def warm_up(app) -> dict:
+    """Pays the import and initialisation costs before the first task
+
+    Returns the time spent in each step, in seconds.
+    """
+    timings = {}
+    with _timed(timings, "imports"):
+        _import_pipeline_machinery()
+    with _timed(timings, "tools"):
+        _load_tool_registry()
+    with _timed(timings, "opencv"):
+        _init_opencv()
+    experiments = app.config["WARMUP_EXPERIMENTS"]
+    if experiments:
+        with _timed(timings, "catalogs"):
+            with app.app_context():
+                _preload_catalogs(experiments)
+    total = sum(timings.values())
+    logger.info(
+        f"Worker warm-up done in {total:.2f}s ("
+        + ", ".join(f"{k}: {v:.2f}s" for k, v in timings.items())
+        + ")"
+    )
+    return timings
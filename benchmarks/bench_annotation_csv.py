@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+"""Compares the disease index file builder against the former quadratic one
+
+Filenames are parsed with a regular expression instead of the ipso_phen file
+handlers, into the metadata the metadata index returns, so only the selection,
+sorting and writing are measured.
+
+Usage: python benchmarks/bench_annotation_csv.py [file_count]
+"""
+import os
+import re
+import sys
+import tempfile
+from timeit import default_timer as timer
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.annotations import generate_annotation_csv
+from app.metadata_index import FileMetadata
+
+FILE_PATTERN = re.compile(r"(?P<plant>plant\d+)_(?P<date_time>[\d\-]+ [\d\-]+)_")
+
+# The legacy implementation is only run up to this many files
+LEGACY_MAX_FILES = 20000
+
+
+class SyntheticFileHandler:
+    def __init__(self, file_path: str):
+        self.plant, self.date_time = parse_synthetic_file(file_path)
+
+
+def parse_synthetic_file(file_path: str) -> tuple:
+    match = FILE_PATTERN.search(os.path.basename(file_path))
+    return match.group("plant"), match.group("date_time")
+
+
+def make_metadata(groups: list) -> dict:
+    metadata = {}
+    for file_path, _ in groups:
+        plant, date_time = parse_synthetic_file(file_path)
+        metadata[file_path] = FileMetadata(plant, None, None, date_time, None)
+    return metadata
+
+
+def make_groups(file_count: int, images_per_series: int = 4) -> list:
+    rng = np.random.default_rng(42)
+    start = pd.Timestamp("2020-01-01")
+    plants = rng.integers(0, 2000, file_count // images_per_series + 1)
+    groups = []
+    for i in range(file_count):
+        series = i // images_per_series
+        date_time = (start + pd.Timedelta(hours=int(series))).strftime(
+            "%Y-%m-%d %H-%M-%S"
+        )
+        groups.append(
+            (
+                f"/data/exp/plant{plants[series]}_{date_time}_vis_side{i % images_per_series}.png",
+                f"luid_{series}",
+            )
+        )
+    return groups
+
+
+def legacy_annotation_csv(groups_to_process, di_filename):
+    files, luids = map(list, zip(*groups_to_process))
+    wrappers = [
+        SyntheticFileHandler(files[i]) for i in [luids.index(x) for x in set(luids)]
+    ]
+    pd.DataFrame.from_dict(
+        {
+            "plant": [i.plant for i in wrappers],
+            "date_time": [i.date_time for i in wrappers],
+            "disease_index": "",
+        }
+    ).sort_values(
+        by=["plant", "date_time"],
+        axis=0,
+        na_position="first",
+        ascending=True,
+    ).to_csv(
+        di_filename,
+        index=False,
+    )
+
+
+def run(name, func, di_filename):
+    start = timer()
+    func(di_filename)
+    print(f"{name:>12}: {timer() - start:8.3f}s")
+    return pd.read_csv(di_filename)
+
+
+if __name__ == "__main__":
+    file_count = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 5
+    groups = make_groups(file_count)
+    metadata = make_metadata(groups)
+    print(f"{file_count} files, {len({luid for _, luid in groups})} series")
+    with tempfile.TemporaryDirectory() as folder:
+        results = {}
+        if file_count <= LEGACY_MAX_FILES:
+            results["legacy"] = run(
+                "legacy",
+                lambda path: legacy_annotation_csv(groups, path),
+                os.path.join(folder, "legacy.csv"),
+            )
+        else:
+            print(f"{'legacy':>12}: skipped above {LEGACY_MAX_FILES} files")
+        results["indexed"] = run(
+            "indexed",
+            lambda path: generate_annotation_csv(
+                groups_to_process=groups,
+                group_by_series=True,
+                di_filename=path,
+                metadata=metadata,
+            ),
+            os.path.join(folder, "indexed.csv"),
+        )
+        reference = results.pop("indexed")
+        for name, result in results.items():
+            assert reference.equals(result), name
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+"""Compares loading an image catalog from ipso_phen's CSV cache and from its snapshot
+
+Also times an incremental refresh bringing one more day of images.
+
+Usage: python benchmarks/bench_catalog_snapshot.py [row_count]
+"""
+import os
+import sys
+import tempfile
+from timeit import default_timer as timer
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.snapshots import CatalogSnapshots, INCREMENTAL_FETCHERS
+
+
+class Info:
+    display_name = "synthetic"
+    target = "bench"
+
+
+class CsvCatalog:
+    """Stand-in pandas wrapper whose remote catalog grows by one day per fetch"""
+
+    def __init__(self, cache_file_path: str, row_count: int):
+        self.db_info = Info()
+        self.cache_file_path = cache_file_path
+        self.row_count = row_count
+        self.df_builder = lambda name: make_catalog(self.row_count)
+
+    def connect_from_cache(self):
+        return pd.read_csv(self.cache_file_path, parse_dates=[4]).reset_index(
+            drop=True
+        )
+
+
+def make_catalog(row_count: int, start: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(start)
+    index = np.arange(start, row_count)
+    return pd.DataFrame(
+        {
+            "Luid": "synthetic_" + index.astype(str),
+            "Experiment": "synthetic",
+            "Plant": rng.integers(0, 2000, index.size).astype(str),
+            "date_time": pd.Timestamp("2020-01-01")
+            + pd.to_timedelta(index * 10, unit="s"),
+            "Camera": rng.choice(["vis", "fluo", "nir"], index.size),
+            "view_option": rng.choice(["side0", "side90", "top"], index.size),
+            "FilePath": "/images/synthetic_" + index.astype(str) + ".png",
+            "blob_path": "./ftp/synthetic_" + index.astype(str) + ".png",
+        }
+    )
+
+
+def timed(name, func):
+    start = timer()
+    result = func()
+    print(f"{name:>20}: {timer() - start:8.3f}s")
+    return result
+
+
+if __name__ == "__main__":
+    row_count = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 6
+    new_rows = 8640
+    with tempfile.TemporaryDirectory() as folder:
+        csv_path = os.path.join(folder, "synthetic.csv")
+        make_catalog(row_count).to_csv(csv_path)
+        catalog = CsvCatalog(csv_path, row_count)
+        snapshots = CatalogSnapshots(os.path.join(folder, "snapshots"), 0)
+        print(f"{row_count} rows")
+        timed("csv cache", catalog.connect_from_cache)
+        timed("first snapshot", lambda: snapshots.refresh(catalog))
+        path = snapshots.get_path(catalog.db_info)
+        snapshot = timed(
+            "snapshot read", lambda: snapshots.read(path).to_pandas(split_blocks=True)
+        )
+        assert snapshot.shape[0] == row_count, snapshot.shape
+        INCREMENTAL_FETCHERS["bench"] = lambda wrapper, since: make_catalog(
+            row_count + new_rows, row_count - 1
+        )
+        table = timed("incremental refresh", lambda: snapshots.refresh(catalog))
+        assert table.num_rows == row_count + new_rows, table.num_rows
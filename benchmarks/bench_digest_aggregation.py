@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+"""Compares the SQL aggregation of an experiment catalog against binning its rows
+
+The catalog is a temporary SQLite file with the snapshots table of ipso_phen's
+SQLite wrapper, read by a stand-in wrapper exposing the same engine attributes.
+
+Usage: python benchmarks/bench_digest_aggregation.py [row_count]
+"""
+import os
+import sys
+import sqlite3
+import tempfile
+import tracemalloc
+from timeit import default_timer as timer
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.digest import aggregate_experiment, bin_experiment
+
+
+class SqliteCatalog:
+    main_table = "snapshots"
+
+    def __init__(self, path: str):
+        self.engine = sqlite3.connect(path)
+
+    def query_to_pandas(self, command: str, columns: str = "*", **kwargs):
+        return pd.read_sql_query(
+            f"{command} {columns} FROM {self.main_table}",
+            self.engine,
+        )
+
+
+def make_catalog(path: str, row_count: int):
+    rng = np.random.default_rng(42)
+    start = pd.Timestamp("2020-01-01").value
+    date_time = pd.to_datetime(
+        rng.integers(start, start + 60 * 86400 * 10 ** 9, row_count)
+    ).floor("s")
+    experiment = pd.DataFrame(
+        {
+            "Luid": np.arange(row_count).astype(str),
+            "Name": "image",
+            "FilePath": "/images/image.jpg",
+            "Experiment": "synthetic",
+            "Plant": rng.integers(0, 2000, row_count).astype(str),
+            "date_time": date_time.strftime("%Y-%m-%d %H:%M:%S"),
+            "Camera": rng.choice(["vis", "fluo", "nir"], row_count),
+            "view_option": rng.choice(["side0", "side90", "top"], row_count),
+        }
+    )
+    conn = sqlite3.connect(path)
+    conn.execute(
+        """CREATE TABLE snapshots (Luid TEXT NOT NULL PRIMARY KEY,
+                                   Name TEXT NOT NULL COLLATE NOCASE,
+                                   FilePath TEXT NOT NULL COLLATE NOCASE,
+                                   Experiment TEXT COLLATE NOCASE,
+                                   Plant TEXT COLLATE NOCASE,
+                                   date_time TIMESTAMP,
+                                   Camera TEXT COLLATE NOCASE,
+                                   view_option TEXT COLLATE NOCASE)"""
+    )
+    experiment.to_sql("snapshots", conn, if_exists="append", index=False)
+    conn.commit()
+    conn.close()
+
+
+def rows_summary(catalog):
+    return bin_experiment(
+        catalog.query_to_pandas(
+            command="SELECT", columns="Plant, date_time, Camera, view_option"
+        )
+    )
+
+
+def run(name, func, catalog):
+    tracemalloc.start()
+    start = timer()
+    summary = func(catalog)
+    elapsed = timer() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:>10}: {elapsed:8.3f}s, peak memory {peak / 2 ** 20:8.1f} MiB")
+    return summary
+
+
+if __name__ == "__main__":
+    row_count = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 6
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "catalog.db")
+        make_catalog(path, row_count)
+        catalog = SqliteCatalog(path)
+        print(f"{row_count} rows")
+        rows = run("rows", rows_summary, catalog)
+        grouped = run("group by", aggregate_experiment, catalog)
+        catalog.engine.close()
+    assert rows["count"] == grouped["count"], (rows["count"], grouped["count"])
+    assert rows["distinct"] == grouped["distinct"], (rows["distinct"], grouped["distinct"])
+    pd.testing.assert_frame_equal(rows["bins"], grouped["bins"], check_dtype=False)
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+"""Compares the experiment digest against the former row based implementation
+
+Usage: python benchmarks/bench_experiment_digest.py [row_count]
+"""
+import os
+import sys
+import json
+from timeit import default_timer as timer
+
+import numpy as np
+import pandas as pd
+import plotly
+import plotly.express as px
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.digest import get_experiment_digest
+
+
+def make_experiment(row_count: int) -> pd.DataFrame:
+    rng = np.random.default_rng(42)
+    start = pd.Timestamp("2020-01-01").value
+    return pd.DataFrame(
+        {
+            "Luid": np.arange(row_count).astype(str),
+            "Experiment": "synthetic",
+            "Plant": rng.integers(0, 2000, row_count).astype(str),
+            "date_time": pd.to_datetime(
+                rng.integers(start, start + 60 * 86400 * 10 ** 9, row_count)
+            ),
+            "Camera": rng.choice(["vis", "fluo", "nir"], row_count),
+            "view_option": rng.choice(["side0", "side90", "top"], row_count),
+        }
+    )
+
+
+def legacy_digest(experiment: pd.DataFrame):
+    df = experiment.copy()
+    temp_date_time = pd.DatetimeIndex(df["date_time"])
+    df.insert(loc=4, column="time", value=temp_date_time.time)
+    df.insert(loc=4, column="date", value=temp_date_time.date)
+    df["hour"] = pd.to_numeric(
+        df.time.astype("str").str.split(pat=":", expand=True).iloc[:, 0]
+    ).to_list()
+    desc_lines = {
+        f"{col.replace('_', ' ').capitalize()}s": f"{len(list(df[col].unique()))} unique"
+        for col in ["Plant", "date", "Camera", "view_option"]
+    }
+    fig = px.density_heatmap(data_frame=df, x="date", y="hour", height=400)
+    return df.shape[0], desc_lines, fig
+
+
+def run(name, func, experiment):
+    start = timer()
+    count, desc_lines, fig = func(experiment)
+    elapsed = timer() - start
+    payload = len(json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder))
+    print(f"{name:>8}: {elapsed:8.3f}s, figure payload {payload / 1024:10.1f} KiB")
+    return desc_lines
+
+
+if __name__ == "__main__":
+    row_count = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 6
+    experiment = make_experiment(row_count)
+    print(f"{row_count} rows")
+    legacy = run("legacy", legacy_digest, experiment)
+    binned = run("binned", get_experiment_digest, experiment)
+    assert legacy == binned, (legacy, binned)
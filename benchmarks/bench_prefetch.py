@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+"""Shows the overlap of image reads and analysis given by the prefetch stage
+
+Slow storage is simulated: the first read of a file waits for the storage
+latency, later reads are served from the page cache. Analysis is simulated by
+a fixed CPU time per group.
+
+Usage: python benchmarks/bench_prefetch.py [group_count] [latency_ms] [analysis_ms]
+"""
+import os
+import sys
+import time
+import threading
+import tempfile
+from timeit import default_timer as timer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.prefetch import Prefetcher, read_file
+
+
+class SlowStorage:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self._cached = set()
+        self._lock = threading.Lock()
+
+    def read(self, file_path: str):
+        with self._lock:
+            cached = file_path in self._cached
+        if not cached:
+            time.sleep(self.latency)
+        buffer = read_file(file_path)
+        with self._lock:
+            self._cached.add(file_path)
+        return buffer
+
+
+def analyse(storage: SlowStorage, group, analysis_time: float):
+    buffer = storage.read(group[0])
+    if buffer is not None:
+        buffer.close()
+    end = timer() + analysis_time
+    while timer() < end:
+        pass
+
+
+def run(groups, latency, analysis_time, depth):
+    storage = SlowStorage(latency)
+    start = timer()
+    if depth > 0:
+        with Prefetcher(groups, depth, reader=storage.read) as prefetcher:
+            for i, group in enumerate(groups):
+                analyse(storage, group, analysis_time)
+                prefetcher.advance(i + 1)
+    else:
+        for group in groups:
+            analyse(storage, group, analysis_time)
+    return timer() - start
+
+
+if __name__ == "__main__":
+    group_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    latency = (float(sys.argv[2]) if len(sys.argv) > 2 else 20) / 1000
+    analysis_time = (float(sys.argv[3]) if len(sys.argv) > 3 else 20) / 1000
+    print(
+        f"{group_count} groups, {latency * 1000:.0f}ms storage latency,"
+        f" {analysis_time * 1000:.0f}ms analysis"
+    )
+    with tempfile.TemporaryDirectory() as folder:
+        groups = []
+        for i in range(group_count):
+            file_path = os.path.join(folder, f"image_{i}.png")
+            with open(file_path, "wb") as f:
+                f.write(os.urandom(256 * 1024))
+            groups.append((file_path, f"luid_{i}"))
+        for depth in [0, 1, 2, 4, 8]:
+            elapsed = run(groups, latency, analysis_time, depth)
+            print(f"depth {depth}: {elapsed:6.2f}s")
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+"""Measures the cold import time of the Flask app with python -X importtime
+
+Each run starts a fresh interpreter, the median of the runs is reported with
+the modules taking the most cumulative time. Exits with an error when
+--max-seconds is given and exceeded, so it can guard startup time.
+
+Usage: python benchmarks/bench_startup.py [--runs 5] [--top 15] [--max-seconds S] [--module ipso_web]
+"""
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+from collections import defaultdict
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def import_times(module: str) -> dict:
+    """Cumulative import time in seconds of each imported module"""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        p for p in [ROOT, env.get("PYTHONPATH", "")] if p
+    )
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr[-2000:])
+    times = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        times[name.strip()] = max(times.get(name.strip(), 0), int(cumulative) / 10 ** 6)
+    return times
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--max-seconds", type=float, default=None)
+    parser.add_argument("--module", default="ipso_web")
+    args = parser.parse_args()
+
+    totals = []
+    modules = defaultdict(list)
+    for _ in range(args.runs):
+        times = import_times(args.module)
+        totals.append(times[args.module])
+        for name, value in times.items():
+            modules[name].append(value)
+
+    total = statistics.median(totals)
+    print(f"import {args.module}: {total:.3f}s (median of {args.runs} runs)")
+    heaviest = sorted(
+        ((statistics.median(v), k) for k, v in modules.items() if k != args.module),
+        reverse=True,
+    )
+    for value, name in heaviest[: args.top]:
+        print(f"{value:8.3f}s  {name}")
+    if args.max_seconds is not None and total > args.max_seconds:
+        print(f"Startup time above {args.max_seconds}s")
+        sys.exit(1)
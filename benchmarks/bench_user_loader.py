@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+"""Requests per second on /taskstatus with the user identity cache on and off
+
+Uses a temporary SQLite file database and Flask's test client, so only the
+application side of a request is measured.
+
+Usage: python benchmarks/bench_user_loader.py [request_count]
+"""
+import os
+import sys
+import tempfile
+from datetime import datetime
+from timeit import default_timer as timer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from config import Config
+
+
+def make_app(folder: str):
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = "sqlite:///" + os.path.join(folder, "bench.db")
+        CACHE_TYPE = "SimpleCache"
+        STATE_STORE_URL = "local://"
+        WTF_CSRF_ENABLED = False
+
+    from app import create_app, db
+    from app.models import User, Job, Role, Group
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+        user = User(username="bench", email="bench@example.com")
+        user.roles = [Role.get_or_create("user")]
+        user.groups = [Group.get_or_create("TPMP")]
+        user.set_password("bench")
+        db.session.add(user)
+        db.session.add(
+            Job(
+                id="bench",
+                owner=user,
+                executor="stream",
+                status="Running",
+                started=datetime.utcnow(),
+            )
+        )
+        db.session.commit()
+    return app
+
+
+def run(app, ttl: float, request_count: int) -> float:
+    from app import identity_cache
+
+    identity_cache.ttl = ttl
+    identity_cache.clear()
+    client = app.test_client()
+    client.post("/auth/login", data={"username": "bench", "password": "bench"})
+    client.get("/taskstatus/bench")
+    start = timer()
+    for _ in range(request_count):
+        response = client.get("/taskstatus/bench")
+        assert response.status_code == 200, response.status_code
+    return request_count / (timer() - start)
+
+
+if __name__ == "__main__":
+    request_count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    with tempfile.TemporaryDirectory() as folder:
+        app = make_app(folder)
+        for ttl in [0, 30]:
+            rate = run(app, ttl, request_count)
+            print(f"cache {'on ' if ttl else 'off'}: {rate:8.0f} requests/s")
@@ -1,9 +1,50 @@
 #!/usr/bin/env python
 import sys
 import os
+import logging
+from timeit import default_timer as timer
+
+from celery.signals import worker_process_init, task_prerun, task_postrun
+
 from app import celery, create_app
+from app.warmup import warm_up
 
 sys.path.append(os.path.join(".", "app"))
 
+logger = logging.getLogger(__name__)
+
 app = create_app()
-app.app_context().push()
\ No newline at end of file
+app.app_context().push()
+
+# Warm-up timings of the worker process, logged with its first task
+_warmup_timings = None
+_first_task = None
+
+
+@worker_process_init.connect
+def warm_up_worker(**kwargs):
+    global _warmup_timings
+
+    _warmup_timings = warm_up(app) if app.config["WORKER_WARMUP"] else {}
+
+
+@task_prerun.connect
+def time_first_task(task_id=None, **kwargs):
+    global _first_task
+
+    if _warmup_timings is not None and _first_task is None:
+        _first_task = (task_id, timer())
+
+
+@task_postrun.connect
+def log_first_task_duration(task_id=None, task=None, **kwargs):
+    global _warmup_timings
+
+    if _first_task is None or _first_task[0] != task_id:
+        return
+    warmup = ", ".join(f"{k}: {v:.2f}s" for k, v in _warmup_timings.items())
+    logger.info(
+        f"First task {task.name} took {timer() - _first_task[1]:.2f}s,"
+        f" warm-up: {warmup or 'disabled'}"
+    )
+    _warmup_timings = None
@@ -29,8 +29,92 @@ class Config(object):
     # Languages WIP
     LANGUAGES = ["en", "es"]
     MS_TRANSLATOR_KEY = os.environ.get("MS_TRANSLATOR_KEY")
-    # Cache configuration
-    CACHE_TYPE = "simple"
+    # Cache configuration, shared by all web and worker processes
+    # FileSystemCache (one host), RedisCache (CACHE_REDIS_URL) or SimpleCache (tests, one process)
+    CACHE_TYPE = os.environ.get("CACHE_TYPE") or "FileSystemCache"
+    CACHE_DIR = os.environ.get("CACHE_DIR") or os.path.join(
+        ".", "generated_files", "cache"
+    )
+    CACHE_REDIS_URL = os.environ.get("CACHE_REDIS_URL") or "redis://localhost:6379/1"
+    CACHE_KEY_PREFIX = "ipso_web/"
+    CACHE_DEFAULT_TIMEOUT = 300
+    # Entries kept by FileSystemCache and SimpleCache before eviction, Redis uses its maxmemory policy
+    CACHE_THRESHOLD = int(os.environ.get("CACHE_THRESHOLD") or 500)
+    # Largest pickled value stored through single flight, 0 for no limit
+    CACHE_MAX_ENTRY_SIZE = int(os.environ.get("CACHE_MAX_ENTRY_SIZE") or 8 * 1024 * 1024)
+    # Single flight, lock lifetime and waiting interval of processes not computing
+    CACHE_LOCK_TIMEOUT = 120
+    CACHE_LOCK_WAIT_INTERVAL = 0.1
+    DIGEST_CACHE_TIMEOUT = int(os.environ.get("DIGEST_CACHE_TIMEOUT") or 600)
     # Celery configuration
     CELERY_BROKER_URL = "redis://localhost:6379/0"
     CELERY_RESULT_BACKEND = "redis://localhost:6379/0"
+    # Shared state (cancellation tokens...), redis:// URL or local:// for a single process
+    STATE_STORE_URL = os.environ.get("STATE_STORE_URL") or CELERY_RESULT_BACKEND
+    CANCELLATION_CHECK_INTERVAL = float(
+        os.environ.get("CANCELLATION_CHECK_INTERVAL") or 2
+    )
+    # Result merging, fragments read per batch, reader threads and CSV copy of the parquet file
+    MERGE_BATCH_SIZE = int(os.environ.get("MERGE_BATCH_SIZE") or 500)
+    MERGE_WORKERS = int(os.environ.get("MERGE_WORKERS") or 4)
+    MERGE_EXPORT_CSV = os.environ.get("MERGE_EXPORT_CSV", "1") != "0"
+    # Logged in users cached by each process, seconds before reload (0 disables) and users kept
+    USER_CACHE_TTL = float(os.environ.get("USER_CACHE_TTL") or 30)
+    USER_CACHE_MAX_SIZE = 1024
+    # Experiment database connections kept by each process, idle seconds before closing,
+    # connections kept and seconds between health checks of a pooled connection
+    DB_POOL_IDLE_TIMEOUT = float(os.environ.get("DB_POOL_IDLE_TIMEOUT") or 600)
+    DB_POOL_MAX_SIZE = int(os.environ.get("DB_POOL_MAX_SIZE") or 16)
+    DB_POOL_HEALTH_CHECK_INTERVAL = float(
+        os.environ.get("DB_POOL_HEALTH_CHECK_INTERVAL") or 60
+    )
+    # Local Arrow snapshots of the phenoserre and phenopsis image catalogs, refreshed
+    # with the newer images when older than the refresh interval in seconds
+    CATALOG_SNAPSHOTS = os.environ.get("CATALOG_SNAPSHOTS", "1") != "0"
+    CATALOG_SNAPSHOT_PATH = os.environ.get("CATALOG_SNAPSHOT_PATH") or os.path.join(
+        ".", "generated_files", "catalogs"
+    )
+    CATALOG_SNAPSHOT_REFRESH_INTERVAL = float(
+        os.environ.get("CATALOG_SNAPSHOT_REFRESH_INTERVAL") or 300
+    )
+    # Last seen timestamps, seconds between bulk writes and smallest change written
+    LAST_SEEN_FLUSH_INTERVAL = float(os.environ.get("LAST_SEEN_FLUSH_INTERVAL") or 5)
+    LAST_SEEN_THRESHOLD = float(os.environ.get("LAST_SEEN_THRESHOLD") or 60)
+    # Server sent events sent per second while a task is streamed
+    SSE_MAX_EVENTS_PER_SECOND = float(os.environ.get("SSE_MAX_EVENTS_PER_SECOND") or 4)
+    # Where streamed tasks run, "celery" workers or, for development only, "local"
+    # threads of the web process, whose jobs are lost when the process restarts
+    STREAM_EXECUTOR = os.environ.get("STREAM_EXECUTOR") or "celery"
+    LOCAL_EXECUTOR_WORKERS = int(os.environ.get("LOCAL_EXECUTOR_WORKERS") or 2)
+    # Jobs, seconds between progress saves and jobs listed per page
+    JOB_SAVE_INTERVAL = float(os.environ.get("JOB_SAVE_INTERVAL") or 10)
+    JOBS_PER_PAGE = 25
+    # Job status polling, cache lifetime, long polling limits and ids per batch request
+    JOB_STATUS_CACHE_TIMEOUT = int(os.environ.get("JOB_STATUS_CACHE_TIMEOUT") or 2)
+    JOB_STATUS_MAX_WAIT = 25
+    JOB_STATUS_POLL_INTERVAL = 0.5
+    JOB_STATUS_MAX_IDS = 100
+    # Image metadata extracted by the file handlers, shared by all runs
+    METADATA_INDEX_PATH = os.environ.get("METADATA_INDEX_PATH") or os.path.join(
+        ".", "generated_files", "metadata_index.db"
+    )
+    # Seconds an idle process pool is kept for the next run of its pipeline
+    PROCESS_POOL_IDLE_TIMEOUT = float(
+        os.environ.get("PROCESS_POOL_IDLE_TIMEOUT") or 300
+    )
+    # Compiled pipelines kept by each process, least recently used ones dropped
+    PIPELINE_CACHE_SIZE = int(os.environ.get("PIPELINE_CACHE_SIZE") or 8)
+    # Result thumbnails shown while a task is streamed, LRU bounded on disk
+    PREVIEW_CACHE_PATH = os.environ.get("PREVIEW_CACHE_PATH") or os.path.join(
+        ".", "generated_files", "previews"
+    )
+    PREVIEW_CACHE_MAX_ITEMS = int(os.environ.get("PREVIEW_CACHE_MAX_ITEMS") or 500)
+    PREVIEW_MAX_SIZE = 320
+    PREVIEW_CACHE_MAX_AGE = 60 * 60 * 24
+    # Celery worker warm-up, comma separated experiments whose catalogs are preloaded
+    WORKER_WARMUP = os.environ.get("WORKER_WARMUP", "1") != "0"
+    WARMUP_EXPERIMENTS = [
+        e.strip() for e in (os.environ.get("WARMUP_EXPERIMENTS") or "").split(",") if e.strip()
+    ]
+    # Distributed mode, number of groups sent to each worker task
+    DISTRIBUTED_CHUNK_SIZE = int(os.environ.get("DISTRIBUTED_CHUNK_SIZE") or 200)
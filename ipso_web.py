@@ -2,7 +2,7 @@ import sys
 import os
 
 from app import create_app, db, cli
-from app.models import User
+from app.models import User, Role, Group, Database
 
 sys.path.append(os.path.join(".", "app"))
 
@@ -12,4 +12,4 @@ cli.register(app)
 
 @app.shell_context_processor
 def make_shell_context():
-    return {"db": db, "User": User}
+    return {"db": db, "User": User, "Role": Role, "Group": Group, "Database": Database}
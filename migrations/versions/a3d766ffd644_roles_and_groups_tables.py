@@ -0,0 +1,112 @@
+"""roles and groups tables, moved from user string columns
+
+Revision ID: a3d766ffd644
+Revises: 8c61b7a9d2f4
+Create Date: 2020-10-12 14:21:08.203114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3d766ffd644'
+down_revision = '8c61b7a9d2f4'
+branch_labels = None
+depends_on = None
+
+DEFAULT_ROLES = ['group_admin', 'super_admin', 'user', 'pending']
+DEFAULT_GROUPS = ['TPMP', 'others', 'pending']
+
+
+def _split(value):
+    return [v.strip() for v in (value or '').split(',') if v.strip()]
+
+
+def _create_named_table(name):
+    op.create_table(name,
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=64), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f(f'ix_{name}_name'), name, ['name'], unique=True)
+
+
+def _create_association_table(name, target):
+    op.create_table(name,
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column(f'{target}_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.ForeignKeyConstraint([f'{target}_id'], [f'{target}.id'], ),
+    sa.PrimaryKeyConstraint('user_id', f'{target}_id')
+    )
+    op.create_index(op.f(f'ix_{name}_{target}_id'), name, [f'{target}_id'], unique=False)
+
+
+def _move_to_tables(conn, column, target, association, defaults):
+    users = conn.execute(sa.text(f'SELECT id, {column} FROM "user"')).fetchall()
+    names = list(defaults)
+    for _, value in users:
+        names.extend(n for n in _split(value) if n not in names)
+    target_table = sa.table(target, sa.column('id', sa.Integer), sa.column('name', sa.String))
+    op.bulk_insert(target_table, [{'id': i + 1, 'name': n} for i, n in enumerate(names)])
+    ids = {n: i + 1 for i, n in enumerate(names)}
+    association_table = sa.table(
+        association, sa.column('user_id', sa.Integer), sa.column(f'{target}_id', sa.Integer)
+    )
+    rows = [
+        {'user_id': user_id, f'{target}_id': ids[n]}
+        for user_id, value in users
+        for n in set(_split(value))
+    ]
+    if rows:
+        op.bulk_insert(association_table, rows)
+
+
+def _move_to_column(conn, column, target, association):
+    rows = conn.execute(sa.text(
+        f'SELECT a.user_id, t.name FROM {association} a '
+        f'JOIN "{target}" t ON t.id = a.{target}_id ORDER BY t.name'
+    )).fetchall()
+    values = {}
+    for user_id, name in rows:
+        values.setdefault(user_id, []).append(name)
+    for user_id, names in values.items():
+        conn.execute(
+            sa.text(f'UPDATE "user" SET {column} = :value WHERE id = :user_id'),
+            {'value': ','.join(names), 'user_id': user_id},
+        )
+
+
+def upgrade():
+    _create_named_table('role')
+    _create_named_table('group')
+    _create_association_table('user_roles', 'role')
+    _create_association_table('user_groups', 'group')
+
+    conn = op.get_bind()
+    _move_to_tables(conn, 'roles', 'role', 'user_roles', DEFAULT_ROLES)
+    _move_to_tables(conn, 'groups', 'group', 'user_groups', DEFAULT_GROUPS)
+
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.drop_column('groups')
+        batch_op.drop_column('roles')
+
+
+def downgrade():
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.add_column(sa.Column('roles', sa.String(length=120), nullable=True))
+        batch_op.add_column(sa.Column('groups', sa.String(length=120), nullable=True))
+
+    conn = op.get_bind()
+    _move_to_column(conn, 'roles', 'role', 'user_roles')
+    _move_to_column(conn, 'groups', 'group', 'user_groups')
+
+    op.drop_index(op.f('ix_user_groups_group_id'), table_name='user_groups')
+    op.drop_table('user_groups')
+    op.drop_index(op.f('ix_user_roles_role_id'), table_name='user_roles')
+    op.drop_table('user_roles')
+    op.drop_index(op.f('ix_group_name'), table_name='group')
+    op.drop_table('group')
+    op.drop_index(op.f('ix_role_name'), table_name='role')
+    op.drop_table('role')
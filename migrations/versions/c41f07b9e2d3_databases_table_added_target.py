@@ -0,0 +1,35 @@
+"""databases table, added target field and default databases
+
+Revision ID: c41f07b9e2d3
+Revises: a3d766ffd644
+Create Date: 2020-10-14 10:37:52.640187
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c41f07b9e2d3'
+down_revision = 'a3d766ffd644'
+branch_labels = None
+depends_on = None
+
+DEFAULT_DATABASES = ['phenoserre', 'phenopsis']
+
+
+def upgrade():
+    with op.batch_alter_table('database') as batch_op:
+        batch_op.add_column(sa.Column('target', sa.String(length=16), nullable=False, server_default='phenoserre'))
+
+    conn = op.get_bind()
+    existing = {r[0] for r in conn.execute(sa.text('SELECT name FROM "database"')).fetchall()}
+    database_table = sa.table('database', sa.column('name', sa.String), sa.column('target', sa.String))
+    rows = [{'name': n, 'target': n} for n in DEFAULT_DATABASES if n not in existing]
+    if rows:
+        op.bulk_insert(database_table, rows)
+
+
+def downgrade():
+    with op.batch_alter_table('database') as batch_op:
+        batch_op.drop_column('target')
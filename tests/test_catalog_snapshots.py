@@ -0,0 +1,69 @@
+import datetime as dt
+
+import pandas as pd
+import pytest
+
+from app.snapshots import CATALOG_COLUMNS, fetch_phenoserre_rows
+
+phenoserre_wrapper = pytest.importorskip(
+    "ipso_phen.ipapi.database.phenoserre_wrapper"
+)
+
+# Rows of the phenoserre query, column names as the database returns them
+QUERY_ROWS = pd.DataFrame(
+    {
+        "experiment": ["Exp_Snap"] * 4,
+        "plant": ["Plant_1", "plant_1", "PLANT_2", "plant_3"],
+        "cam_view_option": [
+            "Brachy_Vis-Side225",
+            "FLUO-Side45",
+            "vis-side-R0",
+            "GGT-Vis-Top",
+        ],
+        "date_time": [
+            "2020-03-01 08:00:00+00",
+            "2020-03-01 08:00:01+00",
+            "2020-03-02 17:30:00+00",
+            "2020-03-03 23:59:59+00",
+        ],
+        "blob_path": ["a/1.png", "a/2.png", "b/3.png", "c/4.png"],
+    }
+)
+
+
+class Info:
+    display_name = "Exp_Snap"
+    target = "phenoserre"
+
+
+class Wrapper:
+    db_info = Info()
+
+
+def test_phenoserre_rows_match_upstream_catalog(monkeypatch):
+    queries = []
+
+    def query_phenoserre(query: str) -> pd.DataFrame:
+        queries.append(query)
+        return QUERY_ROWS.copy()
+
+    monkeypatch.setattr(phenoserre_wrapper, "_query_phenoserre", query_phenoserre)
+    since = dt.datetime(2020, 3, 1, tzinfo=dt.timezone.utc)
+    rows = fetch_phenoserre_rows(Wrapper(), since)
+    expected = phenoserre_wrapper.get_exp_as_df("Exp_Snap")
+
+    assert "s.measurement_label = 'Exp_Snap'" in queries[0]
+    assert f"s.time_stamp >= '{since.isoformat()}'" in queries[0]
+    assert list(rows.columns) == CATALOG_COLUMNS
+    pd.testing.assert_frame_equal(rows, expected)
+
+
+def test_phenoserre_no_new_rows(monkeypatch):
+    monkeypatch.setattr(
+        phenoserre_wrapper,
+        "_query_phenoserre",
+        lambda query: QUERY_ROWS.iloc[:0].copy(),
+    )
+    rows = fetch_phenoserre_rows(Wrapper(), dt.datetime(2020, 3, 1))
+    assert rows.empty
+    assert list(rows.columns) == CATALOG_COLUMNS
@@ -0,0 +1,146 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from app import digest
+from app.digest import aggregate_experiment, aggregate_experiment_sql, bin_experiment
+
+COLUMNS = "Plant, date_time, Camera, view_option"
+
+# Plants and cameras differing by case only, NULL values in every column
+ROWS = [
+    ("1", "plant_a", "2020-01-01 08:10:00", "vis", "side0"),
+    ("2", "Plant_A", "2020-01-01 08:50:00", "VIS", "side0"),
+    ("3", "plant_b", "2020-01-01 17:00:00", "fluo", "side90"),
+    ("4", None, "2020-01-02 08:00:00", None, "top"),
+    ("5", "plant_b", None, "nir", None),
+    ("6", "plant_c", "2020-01-03 23:59:59", "vis", "TOP"),
+]
+
+
+class SqliteCatalog:
+    """Stand-in for ipso_phen's SQLite wrapper, same engine attributes"""
+
+    main_table = "snapshots"
+
+    def __init__(self, path: str):
+        self.engine = sqlite3.connect(path)
+
+    def query_to_pandas(self, command: str, columns: str = "*", **kwargs):
+        return pd.read_sql_query(
+            f"{command} {columns} FROM {self.main_table}", self.engine
+        )
+
+
+class QueryCatalog(SqliteCatalog):
+    """Wrapper without an engine the digest can aggregate with"""
+
+    def __init__(self, path: str):
+        self.connection = sqlite3.connect(path)
+        self.engine = None
+
+    def query_to_pandas(self, command: str, columns: str = "*", **kwargs):
+        return pd.read_sql_query(
+            f"{command} {columns} FROM {self.main_table}", self.connection
+        )
+
+
+class MissingTableCatalog(SqliteCatalog):
+    """Aggregation queries fail, its rows are still readable"""
+
+    main_table = "missing_table"
+
+    def query_to_pandas(self, command: str, columns: str = "*", **kwargs):
+        return pd.read_sql_query(f"{command} {columns} FROM snapshots", self.engine)
+
+
+class DataframeCatalog:
+    """Catalog held in a dataframe, as phenoserre and phenopsis wrappers do"""
+
+    engine = None
+
+    def __init__(self, dataframe: pd.DataFrame):
+        self.dataframe = dataframe
+
+
+def make_catalog(path: str, rows: list):
+    conn = sqlite3.connect(path)
+    conn.execute(
+        """CREATE TABLE snapshots (Luid TEXT NOT NULL PRIMARY KEY,
+                                   Plant TEXT COLLATE NOCASE,
+                                   date_time TIMESTAMP,
+                                   Camera TEXT COLLATE NOCASE,
+                                   view_option TEXT COLLATE NOCASE)"""
+    )
+    conn.executemany("INSERT INTO snapshots VALUES (?, ?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+
+@pytest.fixture(params=[ROWS, []], ids=["rows", "empty"])
+def catalog_path(request, tmp_path):
+    path = str(tmp_path / "catalog.db")
+    make_catalog(path, request.param)
+    return path
+
+
+def binned(path: str) -> dict:
+    catalog = SqliteCatalog(path)
+    try:
+        return bin_experiment(catalog.query_to_pandas("SELECT", COLUMNS))
+    finally:
+        catalog.engine.close()
+
+
+def assert_same_summary(left: dict, right: dict):
+    assert left["count"] == right["count"]
+    assert left["distinct"] == right["distinct"]
+    pd.testing.assert_frame_equal(
+        left["bins"].reset_index(drop=True),
+        right["bins"].reset_index(drop=True),
+        check_dtype=False,
+        check_index_type=False,
+    )
+
+
+def test_sql_aggregation_matches_binning(catalog_path):
+    catalog = SqliteCatalog(catalog_path)
+    assert digest.get_sql_dialect(catalog) == "sqlite"
+    assert_same_summary(
+        aggregate_experiment_sql(catalog, "sqlite"), binned(catalog_path)
+    )
+
+
+def test_sql_aggregation_counts_case_and_null_apart(tmp_path):
+    path = str(tmp_path / "catalog.db")
+    make_catalog(path, ROWS)
+    summary = aggregate_experiment_sql(SqliteCatalog(path), "sqlite")
+    assert summary["count"] == 6
+    assert summary["distinct"] == {
+        "Plant": 5,
+        "date": 4,
+        "Camera": 5,
+        "view_option": 5,
+    }
+    assert summary["bins"]["count"].sum() == 5
+
+
+def test_query_fallback_without_engine(catalog_path):
+    catalog = QueryCatalog(catalog_path)
+    assert digest.get_sql_dialect(catalog) is None
+    assert_same_summary(aggregate_experiment(catalog), binned(catalog_path))
+
+
+def test_dataframe_fallback(catalog_path):
+    dataframe = SqliteCatalog(catalog_path).query_to_pandas("SELECT", COLUMNS)
+    assert_same_summary(
+        aggregate_experiment(DataframeCatalog(dataframe)), binned(catalog_path)
+    )
+
+
+def test_failed_query_falls_back_to_binning(catalog_path):
+    catalog = MissingTableCatalog(catalog_path)
+    with pytest.raises(sqlite3.OperationalError):
+        aggregate_experiment_sql(catalog, "sqlite")
+    assert_same_summary(aggregate_experiment(catalog), binned(catalog_path))